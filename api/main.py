@@ -1,8 +1,9 @@
 from fastapi import APIRouter
-from api.routes import health, chat
+from api.routes import health, chat, batch
 
 app_router = APIRouter()
 
 app_router.include_router(health.router)
 app_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+app_router.include_router(batch.router, prefix="/chat", tags=["chat"])
 
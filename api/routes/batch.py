@@ -0,0 +1,137 @@
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
+from schemas.chat import ChatRequest
+from typing import AsyncIterator, Iterable
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+from api.routes.chat import process_chat, sessions
+from llm.factory import PROVIDERS
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Fields of ChatRequest that can be set once per conversation and apply to every turn
+CONVERSATION_FIELDS = ("swAccessKey", "swContextToken", "swLanguageId", "swLanguageCode", "shopUrl", "pageContext")
+
+
+def parse_conversation(line_no: int, raw: str) -> tuple[str, list[ChatRequest]]:
+    """
+    Parse one JSONL line into an item ID and its chat turns.
+
+    Accepted shapes:
+    - {"request_id": ..., "title": ..., "body": "..."} (the backlog format; `body` is the message)
+    - {"id": ..., "message": "..."} plus any ChatRequest field
+    - {"id": ..., "messages": ["...", {"message": "...", "pageContext": {...}}]} for multi-turn runs
+    """
+    item = json.loads(raw)
+    item_id = str(item.get("request_id") or item.get("id") or line_no)
+    base = {k: item[k] for k in CONVERSATION_FIELDS if k in item}
+
+    if "messages" in item:
+        turns = item["messages"]
+    elif "message" in item:
+        turns = [item["message"]]
+    elif "body" in item:
+        turns = [item["body"]]
+    else:
+        raise ValueError("item has no 'message', 'messages' or 'body'")
+
+    requests = [
+        ChatRequest(**{**base, **(turn if isinstance(turn, dict) else {"message": turn})})
+        for turn in turns
+    ]
+    return item_id, requests
+
+
+async def run_conversation(item_id: str, requests: list[ChatRequest], mcp_clients: list, semaphore: asyncio.Semaphore, provider: str | None = None) -> dict:
+    """Run all turns of one conversation in an isolated session."""
+    session_key = f"batch:{item_id}:{uuid.uuid4().hex[:8]}"
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "completions": 0}
+    turns = []
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            for request in requests:
+                turn_start = time.perf_counter()
+                response, meta = await process_chat(request, mcp_clients, session_id=session_key, provider=provider)
+                for key, value in (meta.get("usage") or {}).items():
+                    usage[key] = usage.get(key, 0) + value
+                turns.append({
+                    "message": request.message,
+                    "response": response.model_dump(),
+                    "latency_ms": round((time.perf_counter() - turn_start) * 1000, 1),
+                    "tools_used": meta.get("tools_used", []),
+                    "usage": meta.get("usage"),
+                    "synthesized": meta.get("synthesized", False),
+                    "error": meta.get("error"),
+                })
+        finally:
+            sessions.pop(session_key, None)
+
+    return {
+        "id": item_id,
+        "provider": provider,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "usage": usage,
+        "turns": turns,
+    }
+
+
+async def run_batch(lines: Iterable[str], mcp_clients: list, concurrency: int = BATCH_CONCURRENCY, provider: str | None = None) -> AsyncIterator[dict]:
+    """
+    Run JSONL conversations through the chat pipeline with bounded parallelism.
+    Results are yielded as they complete; malformed lines yield an error result.
+    `provider` pins the LLM backend, e.g. to compare latency across backends.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = []
+    for line_no, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        try:
+            item_id, requests = parse_conversation(line_no, raw)
+        except Exception as e:
+            yield {"id": str(line_no), "error": f"Invalid item: {e}"}
+            continue
+        tasks.append(asyncio.create_task(run_conversation(item_id, requests, mcp_clients, semaphore, provider)))
+
+    logger.info("Running batch of %d conversations (concurrency=%d)", len(tasks), concurrency)
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/batch", summary="Batch Chat", description="Runs a JSONL body of conversations through the chat pipeline and streams JSONL results with per-item latency and token usage.")
+async def chat_batch(
+    req: Request,
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=64),
+    provider: str | None = Query(None, description="LLM backend to use (e.g. openai, openai_compatible, rule_based)."),
+):
+    """
+    Offline evaluation / bulk processing endpoint.
+    
+    - **body**: JSONL, one conversation per line (see `parse_conversation`).
+    - **concurrency**: Maximum number of conversations processed in parallel.
+    - **provider**: Pins the LLM backend for the whole batch.
+    """
+    if provider is not None and provider not in PROVIDERS:
+        raise HTTPException(status_code=422, detail=f"Unknown LLM provider '{provider}'. Registered: {', '.join(PROVIDERS)}")
+    body = (await req.body()).decode("utf-8")
+    mcp_clients = getattr(req.app.state, "mcp_clients", [])
+
+    async def stream():
+        async for result in run_batch(body.splitlines(), mcp_clients, concurrency, provider):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
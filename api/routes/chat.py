@@ -1,23 +1,90 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from schemas.chat import ChatRequest, ChatResponse
 from pydantic import BaseModel
+import asyncio
+import json
 import logging
 import os
+import time
 
-from llm.factory import get_llm_client
+from llm.factory import get_llm_client, provider_latency_stats
+from core.logging import truncate
+from core.session import Session, SessionState, ROLE_USER, ROLE_ASSISTANT, ROLE_SYSTEM
+from core.cache import get_cache
+from core.payload import resolve_fields, project_data, context_delta, negotiate_encoding, compress
+from llm.routing import all_route_stats
+from mcp_integration.client import tool_result_text
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # In-memory session storage (Dictionary)
-# Key: swContextToken, Value: List of messages
+# Key: swContextToken, Value: Session (ring-buffer history + SessionState)
 # In production, use Redis with TTL
-sessions = {}
+sessions: dict[str, Session] = {}
 HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "6"))
+# Seconds a prefetched product detail is reused for follow-up questions on the same page
+PRODUCT_PREFETCH_TTL = float(os.getenv("PRODUCT_PREFETCH_TTL", "60"))
+PRODUCT_DETAIL_TOOL = "store_product_detail"
+# Description characters of the prefetched detail put into the prompt (the response data keeps all of it)
+PRODUCT_NOTE_DESCRIPTION_CHARS = int(os.getenv("PRODUCT_NOTE_DESCRIPTION_CHARS", "2000"))
+
+# Process-wide counters, exposed via GET /chat/stats
+stats = {
+    "requests": 0,
+    "product_prefetches": 0,
+    "product_prefetch_cache_hits": 0,
+    "prefetched_answered_without_detail_call": 0,
+    "prefetched_answered_without_tools": 0,
+    "tool_responses": 0,
+    "tool_responses_synthesized": 0,
+    # Per response type: count, JSON bytes, bytes sent, serialization time
+    "payload": {},
+}
 
 class ClearRequest(BaseModel):
     swContextToken: str
 
+async def prefetch_product_detail(mcp_clients: list, product_id: str, context: dict):
+    """
+    Fetch the detail of the product the user is viewing, so it can be put straight into the prompt.
+    Returns the parsed tool result, or None if no client provides the tool or the call fails.
+
+    Clients whose tool catalog is not loaded yet are tried directly rather than waiting
+    for `list_tools`, so the prefetch can run alongside it.
+    """
+    for mcp_client in mcp_clients:
+        if mcp_client.cached_tools is not None and not mcp_client.has_tool(PRODUCT_DETAIL_TOOL):
+            continue
+        try:
+            result = await mcp_client.call_tool(PRODUCT_DETAIL_TOOL, {"productId": product_id, **context})
+            detail = json.loads(tool_result_text(result))
+            return detail if isinstance(detail, dict) and "error" not in detail else None
+        except Exception as e:
+            logger.warning("Product detail prefetch failed for %s: %s", product_id, e)
+            return None
+    return None
+
+def product_detail_for_prompt(detail: dict) -> str:
+    """Compact JSON of a product detail for the system note, with the description capped."""
+    description = detail.get("description")
+    if isinstance(description, str) and len(description) > PRODUCT_NOTE_DESCRIPTION_CHARS:
+        detail = {**detail, "description": description[:PRODUCT_NOTE_DESCRIPTION_CHARS] + "..."}
+    return json.dumps(detail, ensure_ascii=False, separators=(",", ":"))
+
+@router.get("/stats", summary="Chat Pipeline Statistics", description="Process-local counters for the chat pipeline (e.g. tool rounds saved by product prefetch) and cache hit rates.")
+async def chat_stats():
+    synthesized_fraction = (
+        round(stats["tool_responses_synthesized"] / stats["tool_responses"], 3) if stats["tool_responses"] else None
+    )
+    return {
+        **stats,
+        "synthesized_fraction": synthesized_fraction,
+        "cache": get_cache().as_dict(),
+        "llm_routes": all_route_stats(),
+        "llm_providers": provider_latency_stats()
+    }
+
 @router.post("/clear", summary="Clear Chat History", description="Clears the chat history for the specified session token.")
 async def clear_history(request: ClearRequest):
     """
@@ -26,173 +93,235 @@ async def clear_history(request: ClearRequest):
     token = request.swContextToken
     if token in sessions:
         del sessions[token]
-        logger.info(f"Cleared session history for token: {token}")
+        logger.info("Cleared session history for token: %s", truncate(token, 12))
     else:
-        logger.info(f"Session token not found for clearing: {token}")
+        logger.info("Session token not found for clearing: %s", truncate(token, 12))
     return {"status": "success"}
 
 @router.post("/", response_model=ChatResponse, summary="Send Chat Message", description="Main interaction endpoint. Sends a user message and returns an AI response with optional structured data.")
-async def chat(request: ChatRequest, req: Request):
+async def chat(
+    request: ChatRequest,
+    req: Request,
+    fields: str | None = Query(None, description="Comma-separated product fields to return (e.g. id,name,price,imageUrl). Overrides `profile`."),
+    profile: str = Query("full", description="Product payload profile: full, compact or minimal."),
+):
     """
     Processes a user message, interacts with the LLM (and tools), and returns a structured response.
     
     - **message**: User input.
     - **swContextToken**: Session identifier (Critical for memory).
     - **pageContext**: Information about the page the user is viewing (e.g. active product).
+    
+    The response is gzip/brotli compressed when the client accepts it, and `context`
+    only carries values that differ from the request.
     """
-    print(f"\n[DEBUG] INCOMING REQUEST: {request.message}")
-    print(f"[DEBUG] Full PageContext: {request.pageContext}")
-    logger.info(f"Received chat message: {request.message}")
+    try:
+        keep = resolve_fields(fields, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    mcp_clients = getattr(req.app.state, "mcp_clients", [])
+    response, _ = await process_chat(request, mcp_clients)
+    return render_response(response, keep, req.headers.get("accept-encoding"))
+
+def render_response(response: ChatResponse, keep: tuple[str, ...] | None, accept_encoding: str | None) -> Response:
+    """Project, serialize and compress a chat response, recording payload sizes per type."""
+    start = time.perf_counter()
+    if keep is not None:
+        response = response.model_copy(update={"data": project_data(response.type, response.data, keep)})
+    body = response.model_dump_json().encode()
+    sent, encoding = compress(body, negotiate_encoding(accept_encoding))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    type_stats = stats["payload"].setdefault(response.type, {"responses": 0, "json_bytes": 0, "sent_bytes": 0, "serialize_ms": 0.0})
+    type_stats["responses"] += 1
+    type_stats["json_bytes"] += len(body)
+    type_stats["sent_bytes"] += len(sent)
+    type_stats["serialize_ms"] = round(type_stats["serialize_ms"] + elapsed_ms, 3)
+    
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=sent, media_type="application/json", headers=headers)
+
+async def process_chat(request: ChatRequest, mcp_clients: list, session_id: str | None = None, provider: str | None = None) -> tuple[ChatResponse, dict]:
+    """
+    Run one chat turn through the full pipeline (session, prefetch, LLM, tools).
+    Shared by the chat endpoint and the batch runner.
+    
+    `session_id` overrides the session key (defaults to swContextToken), so batch
+    conversations stay isolated without changing the token forwarded to the store.
+    `provider` forces an LLM backend (default: LLM_PROVIDER with its failover).
+    Returns the response and pipeline metadata (tools used, token usage).
+    """
+    logger.info("Received chat message: %s", truncate(request.message))
+    logger.debug("PageContext: %s", truncate(request.pageContext))
+    stats["requests"] += 1
     
     # 1. Identify Session
-    session_id = request.swContextToken
+    session_id = session_id or request.swContextToken
     if not session_id:
         logger.warning("No swContextToken provided. Using 'anonymous' session.")
         session_id = "anonymous"
     
-    # 2. Initialize Session if new (dictionary structure)
-    if session_id not in sessions:
-        sessions[session_id] = {"history": [], "context": {"active_product": None}}
+    # 2. Initialize Session if new (history bounded to the prompt window)
+    session = sessions.get(session_id)
+    if session is None:
+        session = sessions[session_id] = Session.create(HISTORY_LIMIT)
+    state: SessionState = session.state
     
     # 3. Add User Message
-    sessions[session_id]["history"].append({"role": "user", "content": request.message})
+    session.add_message(ROLE_USER, request.message)
     
     # 3.5. Handle Frontend Context (Page Tracking)
     
     if request.pageContext is not None:
-        p_id = request.pageContext.get("productId")
+        p_id = request.pageContext.productId
         if p_id:
             # User is on a product page
-            p_name = request.pageContext.get("productName") or "Current Product"
-            sessions[session_id]["context"]["active_product"] = {
-                "id": p_id,
-                "name": p_name
-            }
-            logger.info(f"Frontend Context Set Active: {p_id} ({p_name})")
+            p_name = request.pageContext.productName or "Current Product"
+            state.set_active_product(p_id, p_name)
+            logger.info("Frontend Context Set Active: %s (%s)", p_id, p_name)
         else:
             # User is NOT on a product page (e.g. Home, Category) -> Clear context
-            sessions[session_id]["context"]["active_product"] = None
+            state.clear_active_product()
             logger.info("Frontend Context Cleared Active Product (Navigated away)")
     
+    # Tool context (credentials/session) forwarded to every MCP call
+    context = {
+        "swAccessKey": request.swAccessKey,
+        "swContextToken": request.swContextToken,
+        "swLanguageId": request.swLanguageId,
+        "shopUrl": request.shopUrl
+    }
+    # Filter None values
+    context = {k: v for k, v in context.items() if v is not None}
+    
     try:
-        mcp_clients = getattr(req.app.state, "mcp_clients", [])
-        client = get_llm_client(mcp_clients=mcp_clients)
+        # SPECULATIVE PREFETCH: fetch the viewed product's detail so the model can answer
+        # product-page questions without a tool round. It runs concurrently with loading
+        # the tool catalog, the other I/O needed before the first completion.
+        active_product = state.active_product
+        prefetch_task = None
+        if active_product:
+            if active_product.detail_is_fresh(PRODUCT_PREFETCH_TTL):
+                stats["product_prefetch_cache_hits"] += 1
+            else:
+                prefetch_task = asyncio.create_task(
+                    prefetch_product_detail(mcp_clients, active_product.id, context)
+                )
+        
+        client = get_llm_client(mcp_clients=mcp_clients, provider=provider)
         
-        # 4. Get History for THIS session
-        history_window = sessions[session_id]["history"][-HISTORY_LIMIT:]
+        # 4. Get History for THIS session (excluding current msg)
+        history = session.prompt_history(exclude_last=1)
         
-        # Prepare conversion history (excluding current msg)
-        conversation_history = history_window[:-1]
+        # Background system notes, placed before the history
+        language_note = state_note = product_note = None
         
         # INJECT ACTIVE CONTEXT
-        active_product = sessions[session_id]["context"].get("active_product")
+        prefetched_tool_results = {}
         if active_product:
             # Check if we have the full details (description), if not, try to fetch them
             # This is critical for "landing page" questions where the user hasn't browsed yet
-            product_context_desc = ""
-            
-
-
-            context_msg = (
-                f"SYSTEM NOTE: User is currently viewing product '{active_product['name']}' "
-                f"(ID: {active_product['id']}). "
-                f"IMPORTANT: This is the ONLY active product. Ignore any previous products in history. "
-                f"If the user asks ANY question about THIS product (price, attributes, features, etc.), "
-                f"you MUST call the `store_product_detail` tool with ID '{active_product['id']}'. "
-                f"DO NOT guess. DO NOT use IDs from previous messages."
-            )
-            # Insert at the beginning of history so it's treated as background context
-            conversation_history.insert(0, {"role": "system", "content": context_msg})
-            logger.info(f"Injected Active Context: {active_product['name']}")
+            if prefetch_task:
+                detail, *_ = await asyncio.gather(
+                    prefetch_task,
+                    # Warms the catalog generate_response reads; its errors are handled there
+                    *(mcp_client.list_tools() for mcp_client in mcp_clients),
+                    return_exceptions=True
+                )
+                if isinstance(detail, dict):
+                    active_product.set_detail(detail)
+                    stats["product_prefetches"] += 1
+            if active_product.detail_json:
+                detail = active_product.detail
+                prefetched_tool_results[PRODUCT_DETAIL_TOOL] = detail
+                context_msg = (
+                    f"SYSTEM NOTE: User is currently viewing product '{active_product.name}' "
+                    f"(ID: {active_product.id}). "
+                    f"IMPORTANT: This is the ONLY active product. Ignore any previous products in history. "
+                    f"The current `store_product_detail` result for this product is below. "
+                    f"Answer questions about THIS product from it directly; do NOT call `store_product_detail` for it again. "
+                    f"DO NOT use IDs from previous messages.\n"
+                    f"PRODUCT DETAIL: {product_detail_for_prompt(detail)}"
+                )
+            else:
+                context_msg = (
+                    f"SYSTEM NOTE: User is currently viewing product '{active_product.name}' "
+                    f"(ID: {active_product.id}). "
+                    f"IMPORTANT: This is the ONLY active product. Ignore any previous products in history. "
+                    f"If the user asks ANY question about THIS product (price, attributes, features, etc.), "
+                    f"you MUST call the `store_product_detail` tool with ID '{active_product.id}'. "
+                    f"DO NOT guess. DO NOT use IDs from previous messages."
+                )
+            product_note = context_msg
+            logger.info("Injected Active Context: %s", active_product.name)
+        
+        # INJECT SESSION STATE (compact block, rendered once per state change)
+        state_note = state.render()
         
         # INJECT LANGUAGE INSTRUCTION
         if request.swLanguageCode:
             lang_code = request.swLanguageCode
-            lang_instruction = f"SYSTEM: The user is browsing in locale '{lang_code}'. Please provide your response (message AND suggestions) in the corresponding language (e.g. German for de-DE, English for en-GB)."
-            # Insert at the VERY beginning (before product context if exists, or just first)
-            conversation_history.insert(0, {"role": "system", "content": lang_instruction})
-            logger.info(f"Injected Language Instruction: {lang_code}")
+            language_note = f"SYSTEM: The user is browsing in locale '{lang_code}'. Please provide your response (message AND suggestions) in the corresponding language (e.g. German for de-DE, English for en-GB)."
+            logger.info("Injected Language Instruction: %s", lang_code)
         
-        # Pass history to generate_response
-        context = {
-            "swAccessKey": request.swAccessKey,
-            "swContextToken": request.swContextToken,
-            "swLanguageId": request.swLanguageId,
-            "shopUrl": request.shopUrl
-        }
-        # Filter None values
-        context = {k: v for k, v in context.items() if v is not None}
+        # Language first, then session state and product context, then the history.
+        # generate_response takes history BEFORE the current message and appends it itself.
+        conversation_history = [
+            {"role": ROLE_SYSTEM, "content": note}
+            for note in (language_note, state_note, product_note) if note
+        ]
+        conversation_history.extend(history)
         
-        # Note: We pass the history window excluding the just-added user message if the LLM client adds it internally, 
-        # but here we pass history_window[:-1] assuming generate_response takes history BEFORE current message
-        # OR if generate_response handles the current message separately.
-        # Based on previous code: conversation_history=history_window[:-1]
+        response_data = await client.generate_response(
+            request.message,
+            conversation_history=conversation_history,
+            context=context,
+            prefetched_tool_results=prefetched_tool_results,
+            locale=request.swLanguageCode,
+            session_state=state
+        )
         
-        response_data = await client.generate_response(request.message, conversation_history=conversation_history, context=context)
+        # Share of tool-using requests answered without the second completion
+        if response_data.get("tools_used"):
+            stats["tool_responses"] += 1
+            if response_data.get("synthesized"):
+                stats["tool_responses_synthesized"] += 1
         
-        # Add assistant message to history with a data summary if present
-        user_content = response_data.get("message", "")
+        if prefetched_tool_results:
+            tools_used = response_data.get("tools_used") or []
+            if PRODUCT_DETAIL_TOOL not in tools_used:
+                stats["prefetched_answered_without_detail_call"] += 1
+            if not tools_used:
+                stats["prefetched_answered_without_tools"] += 1
         
-        # SANITIZATION: Safety net against LLM leaking system logs
-        if "SYSTEM_CONTEXT" in user_content:
-            logger.warning("Sanitized LLM response removing SYSTEM_CONTEXT leak.")
-            user_content = user_content.split("SYSTEM_CONTEXT")[0].strip()
-            
-        history_content = user_content
+        user_content = response_data.get("message", "")
         
-        # UPDATE STATE (Active Context)
-        resp_type = response_data.get("type")
+        # UPDATE STATE (Active Context, search state) incrementally from the structured data
+        state.update_from_response(response_data.get("type"), response_data.get("data"), response_data.get("tools_used"))
         
-        if resp_type == "product_detail" and response_data.get("data"):
-            # SET Active Product
-            p_data = response_data["data"]
-            sessions[session_id]["context"]["active_product"] = {
-                "id": p_data.get("id"),
-                "name": p_data.get("name")
-            }
-            logger.info(f"Set Active Product: {p_data.get('name')}")
-            
-        elif resp_type in ["product_list", "order_list", "cart_list"]:
-            # CLEAR Active Product on list views
-            sessions[session_id]["context"]["active_product"] = None
-            logger.info("Cleared Active Product Context")
-
-        # Context Injection for History (invisible to user)
-        if response_data.get("data"):
-            data = response_data["data"]
-            if isinstance(data, dict) and "results" in data:
-                # Capture Search Metadata
-                term = data.get("searchTerm", "unknown")
-                page_info = data.get("pagination", {})
-                page = page_info.get("page", 1)
-                total_pages = 1 # simplified inference or could calculate
-                if page_info.get("limit") and page_info.get("total"):
-                    import math
-                    total_pages = math.ceil(page_info.get("total") / page_info.get("limit"))
+        # 5. Save the clean message to History; what was shown lives in the session state
+        session.add_message(ROLE_ASSISTANT, user_content)
 
-                # Summarize list (ID and Name)
-                summary = " | ".join([f"{r.get('name')} (ID: {r.get('id')})" for r in data["results"][:3]])
-                history_content += f"\nSYSTEM_CONTEXT: SEARCH STATE: Term='{term}', Page={page}/{total_pages}. Displayed items: [{summary}]"
-            elif isinstance(data, dict) and "id" in data:
-                # Single item - include description in history for context
-                desc = data.get('description', '') or ''
-                # Truncate description to save context tokens
-                desc_preview = (desc[:2000] + '...') if len(desc) > 2000 else desc
-                history_content += f"\nSYSTEM_CONTEXT: Displayed item: {data.get('name')} (ID: {data.get('id')})\nDescription (PREVIEW - Call detail tool for full text): {desc_preview}"
+        logger.info("Assistant response: %s", truncate(user_content))
+        logger.debug("Session history length: %d", len(session.history))
         
-        # 5. Save Extended Message to History (so LLM remembers what it showed)
-        sessions[session_id]["history"].append({"role": "assistant", "content": history_content})
-
-        logger.info(f"Assistant response: {user_content}")
-        logger.debug(f"Session {session_id} history length: {len(sessions[session_id]['history'])}")
-        
-        return ChatResponse(
+        response = ChatResponse(
             message=user_content, # Return ONLY the clean message to User
             type=response_data.get("type", "text"),
             data=response_data.get("data"),
             suggestions=(response_data.get("suggestions") or [])[:2],
-            context={**context, **(response_data.get("context") or {})}
+            # Only values the client does not already have (e.g. a new context token)
+            context=context_delta(context, response_data.get("context"))
         )
+        meta = {
+            "tools_used": response_data.get("tools_used") or [],
+            "usage": response_data.get("usage"),
+            "synthesized": bool(response_data.get("synthesized"))
+        }
+        return response, meta
     except Exception as e:
-        logger.error(f"Error generating response: {e}")
-        return ChatResponse(message="Sorry, I encountered an error providing a response.")
+        logger.error("Error generating response: %s", e)
+        return ChatResponse(message="Sorry, I encountered an error providing a response."), {"error": str(e)}
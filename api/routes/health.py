@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 import logging
 
@@ -7,5 +8,16 @@ logger = logging.getLogger(__name__)
 
 @router.get("/health", tags=["Health"])
 async def health_check():
-    logger.info("Health check endpoint called")
+    """Liveness: the process is up and serving requests."""
+    logger.debug("Health check endpoint called")
     return {"status": "ok"}
+
+@router.get("/health/ready", tags=["Health"])
+async def readiness_check(req: Request):
+    """Readiness: MCP is connected and the tool catalog is loaded. Returns 503 until then."""
+    state = getattr(req.app.state, "startup", None)
+    if state is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    state.refresh(getattr(req.app.state, "mcp_clients", []))
+    body = {"status": "ready" if state.ready else "warming_up", **state.as_dict()}
+    return JSONResponse(status_code=200 if state.ready else 503, content=body)
@@ -0,0 +1,409 @@
+"""
+Two-tier cache shared by all uvicorn workers of a host.
+
+- L1: per-process TTL/LRU dict, no I/O on hits.
+- L2: a small cache daemon on a Unix socket (CACHE_SOCKET), shared by every worker.
+  Writes and deletes are broadcast to the other workers so they drop stale L1 copies.
+
+The socket lives in a private directory (mode 0700, default under $XDG_RUNTIME_DIR,
+else ~/.cache). A socket or daemon owned by another user is refused, so other local
+users can neither read nor poison cached tool results.
+
+The first worker to start hosts the daemon in its event loop; the others connect to it.
+It can also be run standalone with `python -m core.cache`. Without CACHE_SOCKET, or
+while the daemon is unreachable, the cache degrades to L1 only.
+"""
+import asyncio
+import fcntl
+import itertools
+import json
+import logging
+import os
+import socket
+import stat
+import struct
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(runtime_dir, "ai-support-agent", "cache.sock")
+
+
+CACHE_SOCKET = os.getenv("CACHE_SOCKET") or default_socket_path()
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "2048"))
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))
+CACHE_L2_MAX_ENTRIES = int(os.getenv("CACHE_L2_MAX_ENTRIES", "50000"))
+L2_RETRY_SECONDS = 5.0
+
+
+def ensure_private_dir(path: str):
+    """Create the socket directory (mode 0700) or check that an existing one is ours and private."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by uid {os.getuid()} with mode 0700")
+
+
+def _check_socket_owner(path: str):
+    """Refuse a socket file that is not a socket or belongs to another user."""
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by uid {os.getuid()}")
+
+
+def _check_peer(writer: asyncio.StreamWriter):
+    """Refuse a daemon process running as another user (where the OS reports peer credentials)."""
+    sock = writer.get_extra_info("socket")
+    if sock is None or not hasattr(socket, "SO_PEERCRED"):
+        return
+    _pid, uid, _gid = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    if uid != os.getuid():
+        raise PermissionError(f"cache daemon runs as uid {uid}, expected {os.getuid()}")
+
+
+class LocalCache:
+    """In-process TTL cache with LRU eviction."""
+    def __init__(self, max_entries: int = CACHE_L1_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheDaemon:
+    """
+    L2 cache server speaking newline-delimited JSON over a Unix socket.
+
+    Requests: {"op": "get"|"set"|"delete"|"subscribe", "id", "key", "value", "ttl", "origin"}.
+    Every reply echoes the request's "id". A "subscribe" connection only receives
+    {"invalidate": key, "origin": id} messages.
+    """
+    def __init__(self, path: str = CACHE_SOCKET, max_entries: int = CACHE_L2_MAX_ENTRIES):
+        self.path = path
+        self.store = LocalCache(max_entries)
+        self.subscribers: set[asyncio.StreamWriter] = set()
+        self.clients: set[asyncio.StreamWriter] = set()
+        self.server: asyncio.AbstractServer | None = None
+        self.closing = False
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info("Cache daemon listening on %s", self.path)
+
+    async def close(self):
+        if self.server:
+            self.closing = True
+            self.server.close()
+            # wait_closed() waits for every open connection, so close the clients first
+            for writer in list(self.clients):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.closing:
+            writer.close()
+            return
+        self.clients.add(writer)
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "subscribe":
+                    self.subscribers.add(writer)
+                    continue
+                if op == "get":
+                    reply = {"value": self.store.get(request["key"])}
+                elif op == "set":
+                    self.store.set(request["key"], request["value"], request.get("ttl", CACHE_L1_TTL))
+                    self._broadcast(request["key"], request.get("origin"))
+                    reply = {"ok": True}
+                elif op == "delete":
+                    self.store.delete(request["key"])
+                    self._broadcast(request["key"], request.get("origin"))
+                    reply = {"ok": True}
+                else:
+                    reply = {"error": f"unknown op {op!r}"}
+                reply["id"] = request.get("id")
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.debug("Cache daemon connection closed: %s", e)
+        finally:
+            self.clients.discard(writer)
+            self.subscribers.discard(writer)
+            writer.close()
+
+    def _broadcast(self, key: str, origin: str | None):
+        message = json.dumps({"invalidate": key, "origin": origin}).encode() + b"\n"
+        for writer in list(self.subscribers):
+            if writer.is_closing():
+                self.subscribers.discard(writer)
+            else:
+                writer.write(message)
+
+
+class SharedCache:
+    """
+    L1 in-process cache in front of the shared L2 daemon.
+    Values must be JSON-serializable.
+    """
+    def __init__(self, socket_path: str | None = CACHE_SOCKET, l1_ttl: float = CACHE_L1_TTL):
+        self.socket_path = socket_path
+        self.l1_ttl = l1_ttl
+        self.l1 = LocalCache()
+        self.origin = uuid.uuid4().hex[:8]
+        self.daemon: CacheDaemon | None = None
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0, "l2_errors": 0}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._subscriber_task: asyncio.Task | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._request_ids = itertools.count()
+        self._l2_failed_at: float | None = None
+        self._host_lock_fd: int | None = None
+
+    @property
+    def l2_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def start(self):
+        """Connect to the L2 daemon, hosting it in this process if none is running."""
+        if not self.socket_path:
+            return
+        try:
+            ensure_private_dir(os.path.dirname(self.socket_path))
+            await self._connect()
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        except PermissionError as e:
+            self._refuse(e)
+            return
+
+        # No daemon yet (or a stale socket file). Only the worker holding the host lock
+        # may replace the socket, so concurrent starts cannot end up with two daemons.
+        if self._acquire_host_lock():
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.daemon = CacheDaemon(self.socket_path)
+            await self.daemon.start()
+
+        for _ in range(20):
+            try:
+                await self._connect()
+                return
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                error = e
+                await asyncio.sleep(0.05)
+            except PermissionError as e:
+                self._refuse(e)
+                return
+        self._mark_l2_failed(error)
+
+    def _refuse(self, error: PermissionError):
+        """Disable the L2 tier for good: the socket location cannot be trusted."""
+        logger.error("Shared cache disabled, refusing %s: %s", self.socket_path, error)
+        self.socket_path = None
+
+    def _acquire_host_lock(self) -> bool:
+        fd = os.open(self.socket_path + ".lock", os.O_CREAT | os.O_RDWR | os.O_NOFOLLOW, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # Held for the lifetime of the process; released by the OS if the host dies
+        self._host_lock_fd = fd
+        return True
+
+    async def close(self):
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._drop_connection()
+        if self.daemon:
+            await self.daemon.close()
+            self.daemon = None
+        if self._host_lock_fd is not None:
+            os.close(self._host_lock_fd)
+            self._host_lock_fd = None
+
+    def _drop_connection(self):
+        """Close the request connection and stop the invalidation listener."""
+        if self._subscriber_task:
+            self._subscriber_task.cancel()
+            self._subscriber_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        self._reader = None
+
+    async def _connect(self):
+        _check_socket_owner(self.socket_path)
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            _check_peer(writer)
+        except PermissionError:
+            writer.close()
+            raise
+        self._drop_connection()
+        self._reader, self._writer = reader, writer
+        sub_reader, sub_writer = await asyncio.open_unix_connection(self.socket_path)
+        sub_writer.write(json.dumps({"op": "subscribe", "origin": self.origin}).encode() + b"\n")
+        await sub_writer.drain()
+        self._subscriber_task = asyncio.create_task(self._listen(sub_reader, sub_writer))
+        self._l2_failed_at = None
+        logger.info("Connected to shared cache at %s", self.socket_path)
+
+    async def _listen(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Drop L1 entries written or deleted by other workers."""
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("origin") != self.origin:
+                    self.l1.delete(message["invalidate"])
+                    self.stats["invalidations"] += 1
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning("Shared cache invalidation channel closed: %s", e)
+        finally:
+            writer.close()
+
+    def _mark_l2_failed(self, error: Exception):
+        logger.warning("Shared cache unavailable, using in-process cache only: %s", error)
+        self.stats["l2_errors"] += 1
+        self._l2_failed_at = time.monotonic()
+        self._drop_connection()
+        # The invalidation channel is gone too; L1 entries can no longer be trusted
+        self.l1 = LocalCache(self.l1.max_entries)
+
+    async def _reconnect(self):
+        try:
+            await self.start()
+        except OSError as e:
+            self._mark_l2_failed(e)
+        finally:
+            self._reconnect_task = None
+
+    async def _request(self, payload: dict) -> dict | None:
+        if not self.l2_connected:
+            # Reconnect in a single background task; requests meanwhile use L1 only
+            retry_due = self._l2_failed_at is not None and time.monotonic() - self._l2_failed_at >= L2_RETRY_SECONDS
+            if retry_due and self._reconnect_task is None:
+                self._reconnect_task = asyncio.create_task(self._reconnect())
+            return None
+        request_id = next(self._request_ids)
+        try:
+            async with self._lock:
+                # The connection may have failed while this request waited for the lock
+                if not self.l2_connected:
+                    return None
+                self._writer.write(json.dumps({**payload, "id": request_id}).encode() + b"\n")
+                await self._writer.drain()
+                while True:
+                    line = await self._reader.readline()
+                    if not line:
+                        raise ConnectionError("cache daemon closed the connection")
+                    reply = json.loads(line)
+                    # Replies come back in request order; earlier ones belong to requests
+                    # that were cancelled after writing and must not answer this one
+                    if reply.get("id") == request_id:
+                        return reply
+        except (OSError, ConnectionError, json.JSONDecodeError) as e:
+            self._mark_l2_failed(e)
+            return None
+
+    async def get(self, key: str):
+        value = self.l1.get(key)
+        if value is not None:
+            self.stats["l1_hits"] += 1
+            return value
+        reply = await self._request({"op": "get", "key": key})
+        value = reply.get("value") if reply else None
+        if value is not None:
+            self.stats["l2_hits"] += 1
+            self.l1.set(key, value, self.l1_ttl)
+            return value
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value, ttl: float):
+        self.l1.set(key, value, min(ttl, self.l1_ttl))
+        await self._request({"op": "set", "key": key, "value": value, "ttl": ttl, "origin": self.origin})
+
+    async def delete(self, key: str):
+        self.l1.delete(key)
+        await self._request({"op": "delete", "key": key, "origin": self.origin})
+
+    def as_dict(self) -> dict:
+        lookups = self.stats["l1_hits"] + self.stats["l2_hits"] + self.stats["misses"]
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "l1_entries": len(self.l1),
+            "l2_connected": self.l2_connected,
+            "hosts_daemon": self.daemon is not None,
+        }
+
+
+_cache: SharedCache | None = None
+
+
+def get_cache() -> SharedCache:
+    """Return the process-wide cache (L1 only until `start()` connects it to the daemon)."""
+    global _cache
+    if _cache is None:
+        socket_path = CACHE_SOCKET if os.getenv("CACHE_SHARED", "true").lower() not in ("0", "false", "no") else None
+        _cache = SharedCache(socket_path)
+    return _cache
+
+
+async def _serve_forever():
+    ensure_private_dir(os.path.dirname(CACHE_SOCKET))
+    cache = SharedCache(CACHE_SOCKET)
+    if not cache._acquire_host_lock():
+        raise SystemExit(f"A cache daemon is already hosted on {CACHE_SOCKET}")
+    daemon = CacheDaemon()
+    if os.path.exists(daemon.path):
+        os.unlink(daemon.path)
+    await daemon.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await daemon.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve_forever())
@@ -1 +1 @@
-from .logger import setup_logging
+from .logger import setup_logging, shutdown_logging, request_id_var, new_request_id, truncate, sample_payload
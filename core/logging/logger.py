@@ -1,12 +1,151 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import uuid
 
-def setup_logging():
-    """Confiure basic logging for the application."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(funcName)s - %(lineno)d - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+# Correlation ID of the request currently being handled (set by the HTTP middleware).
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "300"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Truncated:
+    """
+    Lazily rendered, length-capped view of a log payload.
+    The value is only converted to text if the record passes the level check.
+    """
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int | None = None):
+        self.value = value
+        self.limit = LOG_MAX_FIELD_CHARS if limit is None else limit
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}...(+{len(text) - self.limit} chars)"
+
+
+def truncate(value, limit: int | None = None) -> Truncated:
+    """Wrap a payload for logging so it is formatted lazily and capped in length."""
+    return Truncated(value, limit)
+
+
+def sample_payload() -> bool:
+    """Return True if a full payload should be logged for this call (LOG_PAYLOAD_SAMPLE_RATE)."""
+    return LOG_PAYLOAD_SAMPLE_RATE >= 1.0 or random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current correlation ID to every record."""
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that keeps the traceback out of the message.
+
+    The stock `prepare()` runs the full formatter on the calling thread and appends the
+    traceback to `msg`. Here only the message is rendered (its args may change once the
+    caller moves on); the traceback goes to `exc_text` so formatters can emit it as its
+    own field.
+    """
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line."""
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(stream=None):
+    """
+    Configure application logging.
+
+    The calling coroutine only renders the message text (args and lazy `truncate()`
+    payloads) and pushes the record onto an in-memory queue. JSON/text formatting and
+    the write to stdout happen in a background listener thread, so the event loop
+    never blocks on I/O.
+    LOG_FORMAT=json|text selects the output format, LOG_LEVEL sets the level and
+    LOG_ENABLED=false disables logging entirely (useful for overhead benchmarks).
+    `stream` defaults to stdout; CLIs that write results to stdout pass sys.stderr.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    if _listener is not None:
+        return
+
+    if os.getenv("LOG_ENABLED", "true").lower() in ("0", "false", "no"):
+        logging.disable(logging.CRITICAL)
+        return
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(funcName)s - %(lineno)d - %(levelname)s - [%(request_id)s] %(message)s"
+        ))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
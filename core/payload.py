@@ -0,0 +1,87 @@
+"""
+Response payload slimming: field projection, context deltas and negotiated compression.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used when brotli is not installed
+    brotli = None
+
+# Responses smaller than this are sent uncompressed (headers would outweigh the gain)
+COMPRESSION_MIN_BYTES = 512
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Named field sets for product payloads; "full" keeps the tool output untouched
+RESPONSE_PROFILES = {
+    "full": None,
+    "compact": ("id", "productNumber", "name", "price", "stock", "imageUrl", "url", "options"),
+    "minimal": ("id", "name", "price", "imageUrl"),
+}
+
+# Top-level keys of list payloads that are always kept
+LIST_METADATA_KEYS = ("searchTerm", "pagination", "total")
+
+
+def resolve_fields(fields: str | None, profile: str | None) -> tuple[str, ...] | None:
+    """Fields to keep from `fields=a,b,c` (wins) or a named profile; None keeps everything."""
+    if fields is not None:
+        keep = tuple(f.strip() for f in fields.split(",") if f.strip())
+        if not keep:
+            raise ValueError("'fields' must name at least one field, e.g. fields=id,name,price")
+        return keep
+    if profile not in RESPONSE_PROFILES:
+        raise ValueError(f"Unknown response profile '{profile}'. Use one of: {', '.join(RESPONSE_PROFILES)}")
+    return RESPONSE_PROFILES[profile]
+
+
+def _pick(item, keep: tuple[str, ...]):
+    return {k: item[k] for k in keep if k in item} if isinstance(item, dict) else item
+
+
+def project_data(resp_type: str, data, keep: tuple[str, ...] | None):
+    """Apply a field projection to the product items of a response payload."""
+    if keep is None or not isinstance(data, dict):
+        return data
+    if resp_type == "product_list" and isinstance(data.get("results"), list):
+        projected = {k: data[k] for k in LIST_METADATA_KEYS if k in data}
+        projected["results"] = [_pick(item, keep) for item in data["results"]]
+        return projected
+    if resp_type == "product_detail":
+        return _pick(data, keep)
+    return data
+
+
+def context_delta(request_context: dict, response_context: dict | None) -> dict | None:
+    """Context keys the client does not already have (None if nothing changed)."""
+    changed = {k: v for k, v in (response_context or {}).items() if request_context.get(k) != v}
+    return changed or None
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header (q-values honoured, q=0 excluded)."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.strip().lower()] = q
+    candidates = [enc for enc in ("br", "gzip") if offered.get(enc, offered.get("*", 0)) > 0]
+    if brotli is None and "br" in candidates:
+        candidates.remove("br")
+    return max(candidates, key=lambda enc: offered.get(enc, offered.get("*", 0)), default=None)
+
+
+def compress(body: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    """Compress `body` with the negotiated encoding; returns (bytes, applied encoding or None)."""
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
@@ -0,0 +1,146 @@
+import json
+import math
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+
+# Interned role strings shared by every history entry
+ROLE_SYSTEM = sys.intern("system")
+ROLE_USER = sys.intern("user")
+ROLE_ASSISTANT = sys.intern("assistant")
+
+
+@dataclass(slots=True)
+class Message:
+    """One history entry; converted to the LLM wire format only when a prompt is built."""
+    role: str
+    content: str
+
+    def __post_init__(self):
+        self.role = sys.intern(self.role)
+
+    def as_dict(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+
+@dataclass(slots=True, frozen=True)
+class ProductSummary:
+    id: str
+    name: str | None
+
+
+@dataclass(slots=True)
+class ActiveProduct:
+    id: str
+    name: str
+    # Last store_product_detail result for this product (prefetched or shown), kept as
+    # compact JSON text rather than a nested dict; parsed only when it is used
+    detail_json: str | None = None
+    fetched_at: float = 0.0
+
+    @property
+    def detail(self) -> dict | None:
+        return json.loads(self.detail_json) if self.detail_json is not None else None
+
+    def set_detail(self, detail: dict):
+        self.detail_json = json.dumps(detail, ensure_ascii=False, separators=(",", ":"))
+        self.fetched_at = time.monotonic()
+
+    def detail_is_fresh(self, ttl: float) -> bool:
+        return self.detail_json is not None and time.monotonic() - self.fetched_at < ttl
+
+
+@dataclass(slots=True)
+class SessionState:
+    """
+    Structured per-session memory of what the user has been shown.
+
+    Updated incrementally after each turn and rendered into one compact context
+    block for the prompt, instead of carrying it as prose inside history messages.
+    Full product data is not kept in the block; the model fetches it on demand
+    with `store_product_detail`.
+    """
+    search_term: str | None = None
+    page: int | None = None
+    total_pages: int | None = None
+    displayed_items: tuple[ProductSummary, ...] = ()
+    active_product: ActiveProduct | None = None
+    _rendered: str | None = field(default=None, repr=False, compare=False)
+
+    DISPLAYED_ITEMS_LIMIT = 3
+
+    def set_active_product(self, product_id: str, name: str, detail: dict | None = None):
+        # Keep a prefetched detail when the same product is re-announced by the page context
+        if self.active_product is None or self.active_product.id != product_id:
+            self.active_product = ActiveProduct(product_id, name)
+            self._rendered = None
+        if detail is not None:
+            self.active_product.set_detail(detail)
+
+    def clear_active_product(self):
+        if self.active_product is not None:
+            self.active_product = None
+            self._rendered = None
+
+    def update_from_response(self, resp_type: str | None, data, tools_used: list | None = None):
+        """
+        Fold the structured data of an assistant turn into the state.
+
+        A product detail is only stored (and its freshness re-stamped) when
+        `store_product_detail` actually ran this turn; a prefetched detail stitched
+        back into the response keeps the time it was fetched.
+        """
+        if resp_type == "product_detail" and isinstance(data, dict) and data.get("id"):
+            fetched = "store_product_detail" in (tools_used or ())
+            self.set_active_product(data["id"], data.get("name"), detail=data if fetched else None)
+            self.displayed_items = (ProductSummary(data["id"], data.get("name")),)
+            self._rendered = None
+        elif resp_type in ("product_list", "order_list", "cart_list"):
+            self.clear_active_product()
+
+        if isinstance(data, dict) and "results" in data:
+            page_info = data.get("pagination") or {}
+            self.search_term = data.get("searchTerm") or self.search_term
+            self.page = page_info.get("page", 1)
+            self.total_pages = 1
+            if page_info.get("limit") and page_info.get("total"):
+                self.total_pages = math.ceil(page_info["total"] / page_info["limit"])
+            self.displayed_items = tuple(
+                ProductSummary(r.get("id"), r.get("name")) for r in data["results"][:self.DISPLAYED_ITEMS_LIMIT]
+            )
+            self._rendered = None
+
+    def render(self) -> str | None:
+        """Compact context block for the prompt (cached until the state changes)."""
+        if self._rendered is None:
+            lines = []
+            if self.search_term is not None:
+                lines.append(f"Last search: term='{self.search_term}', page={self.page}/{self.total_pages}")
+            if self.displayed_items:
+                items = " | ".join(f"{item.name} (ID: {item.id})" for item in self.displayed_items)
+                lines.append(f"Displayed items: [{items}]")
+            self._rendered = "SESSION STATE:\n" + "\n".join(lines) if lines else ""
+        return self._rendered or None
+
+
+@dataclass(slots=True)
+class Session:
+    """
+    In-memory chat session: a ring buffer of the last `history_limit` messages
+    plus the structured state. Older messages are dropped as new ones arrive.
+    """
+    history: deque
+    state: SessionState = field(default_factory=SessionState)
+
+    @classmethod
+    def create(cls, history_limit: int) -> "Session":
+        return cls(history=deque(maxlen=history_limit))
+
+    def add_message(self, role: str, content: str):
+        self.history.append(Message(role, content))
+
+    def prompt_history(self, exclude_last: int = 0) -> list[dict]:
+        """History in LLM wire format, optionally without the newest `exclude_last` messages."""
+        return [m.as_dict() for m in islice(self.history, 0, len(self.history) - exclude_last)]
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from llm.factory import warmup_llm_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StartupState:
+    """Readiness of the external dependencies, filled in by the background warmup."""
+    started_at: float = field(default_factory=time.perf_counter)
+    import_seconds: float | None = None
+    mcp_connected: bool = False
+    tools_loaded: int = 0
+    llm_warm: bool = False
+    warmup_done: bool = False
+    timings: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def ready(self) -> bool:
+        # Serving chat requires the tool catalog; an unwarmed LLM connection only costs latency
+        return self.mcp_connected and self.tools_loaded > 0
+
+    def refresh(self, mcp_clients: list):
+        """Re-derive MCP readiness from the live clients (they may reconnect after a failed warmup)."""
+        self.mcp_connected = bool(mcp_clients) and all(c.is_connected for c in mcp_clients)
+        self.tools_loaded = sum(len(c.cached_tools or []) for c in mcp_clients)
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_done": self.warmup_done,
+            "mcp_connected": self.mcp_connected,
+            "tools_loaded": self.tools_loaded,
+            "llm_warm": self.llm_warm,
+            "import_seconds": self.import_seconds,
+            "timings": self.timings,
+            "errors": self.errors,
+        }
+
+
+async def _timed(state: StartupState, name: str, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    except Exception as e:
+        state.errors[name] = repr(e)
+        logger.error("Warmup step '%s' failed: %s", name, e)
+        return None
+    finally:
+        state.timings[name] = round(time.perf_counter() - start, 3)
+
+
+async def _warm_mcp(state: StartupState, mcp_clients: list):
+    for client in mcp_clients:
+        # Same lock as the lazy reconnect of chat requests that arrive during warmup
+        await client.ensure_connected()
+        state.mcp_connected = client.is_connected
+        tools = await client.list_tools(refresh=True)
+        state.tools_loaded += len(tools)
+
+
+async def run_warmup(state: StartupState, mcp_clients: list):
+    """
+    Connect MCP, preload the tool catalog and open the LLM connection concurrently.
+    Failures are recorded on `state`; chat requests fall back to lazy reconnects.
+    """
+    await asyncio.gather(
+        _timed(state, "mcp", _warm_mcp(state, mcp_clients)),
+        _timed(state, "llm", warmup_llm_client()),
+    )
+    state.llm_warm = "llm" not in state.errors
+    state.warmup_done = True
+    state.timings["total"] = round(time.perf_counter() - state.started_at, 3)
+    logger.info("Warmup finished: %s", state.as_dict())
@@ -1,9 +1,39 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from core.session import SessionState
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """What a backend supports; the pipeline adapts its requests to these flags."""
+    tools: bool = True       # native function calling
+    json_mode: bool = True   # response_format={"type": "json_object"}
+    streaming: bool = True
+
+class ToolSideEffectError(RuntimeError):
+    """
+    A turn failed after a state-changing tool (e.g. store_cart_add) had already run.
+    It must not be retried on another backend, which would repeat the side effect.
+    """
+    def __init__(self, tools: list[str]):
+        super().__init__(f"Response failed after state-changing tools ran: {', '.join(tools)}")
+        self.tools = tools
 
 class BaseLLMClient(ABC):
+    provider: str = "base"
+    capabilities: ProviderCapabilities = ProviderCapabilities()
+
     @abstractmethod
-    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None) -> str:
+    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None, prefetched_tool_results: dict = None, locale: str = None, session_state: SessionState = None) -> str:
         """
         Generate a response from the LLM based on the message and history.
+        `prefetched_tool_results` maps tool names to results already fetched by the caller,
+        so they can be stitched into the response without the model calling the tool.
+        `locale` is the shop locale (e.g. de-DE) used for template-rendered responses.
+        `session_state` is the structured session memory, for backends that act on it
+        directly (LLM backends read its rendered form from the history).
         """
         raise NotImplementedError
+
+    async def warmup(self):
+        """Open connections ahead of the first request (no-op for in-process backends)."""
+        return None
@@ -1,16 +1,153 @@
+import asyncio
+import logging
 import os
-from .base import BaseLLMClient
-from .openai_client import OpenAIClient
+import time
+from typing import Callable
+from .base import BaseLLMClient, ProviderCapabilities, ToolSideEffectError
+from core.session import SessionState
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-def get_llm_client(mcp_clients=None) -> BaseLLMClient:
+# Provider name -> constructor taking the MCP clients
+PROVIDERS: dict[str, Callable[[list], BaseLLMClient]] = {}
+
+# Per-provider latency/failure accounting, exposed via GET /chat/stats
+provider_stats: dict[str, dict] = {}
+
+
+def register_provider(name: str):
+    """Register an LLM backend constructor under `name` (selected with LLM_PROVIDER)."""
+    def decorator(constructor: Callable[[list], BaseLLMClient]):
+        PROVIDERS[name] = constructor
+        return constructor
+    return decorator
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() not in ("0", "false", "no")
+
+
+@register_provider("openai")
+def _openai(mcp_clients):
+    from .openai_client import OpenAIClient
+    return OpenAIClient(mcp_clients=mcp_clients)
+
+
+@register_provider("openai_compatible")
+def _openai_compatible(mcp_clients):
+    """Any server speaking the OpenAI chat-completions API (vLLM, llama.cpp, Ollama, LM Studio)."""
+    from .openai_client import OpenAIClient
+    from .routing import get_model_router
+    base_url = os.getenv("LLM_BASE_URL", "http://localhost:11434/v1")
+    capabilities = ProviderCapabilities(
+        tools=_env_flag("LLM_SUPPORTS_TOOLS", True),
+        json_mode=_env_flag("LLM_SUPPORTS_JSON_MODE", True),
+        streaming=_env_flag("LLM_SUPPORTS_STREAMING", True),
+    )
+    return OpenAIClient(
+        mcp_clients=mcp_clients,
+        base_url=base_url,
+        api_key=os.getenv("LLM_API_KEY", "not-needed"),
+        capabilities=capabilities,
+        router=get_model_router("openai_compatible", os.getenv("LLM_COMPATIBLE_MODEL", "llama3.1")),
+        provider="openai_compatible",
+    )
+
+
+@register_provider("rule_based")
+def _rule_based(mcp_clients):
+    from .rule_based import RuleBasedClient
+    return RuleBasedClient(mcp_clients=mcp_clients)
+
+
+class FailoverClient(BaseLLMClient):
+    """
+    Tries each backend in order; the next one answers if a backend raises.
+    A backend that failed after running a state-changing tool is not retried
+    (ToolSideEffectError), since the next one would run the tool again.
+    """
+    provider = "failover"
+
+    def __init__(self, clients: list[BaseLLMClient]):
+        self.clients = clients
+        self.capabilities = clients[0].capabilities
+
+    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None, prefetched_tool_results: dict = None, locale: str = None, session_state: SessionState = None) -> dict:
+        for index, client in enumerate(self.clients):
+            try:
+                return await _timed_generate(client, message, conversation_history, context, prefetched_tool_results, locale, session_state)
+            except ToolSideEffectError:
+                raise
+            except Exception as e:
+                if index == len(self.clients) - 1:
+                    raise
+                logger.warning("Provider '%s' failed (%s); failing over to '%s'",
+                               client.provider, type(e).__name__, self.clients[index + 1].provider)
+
+    async def warmup(self):
+        for client in self.clients:
+            await client.warmup()
+
+
+async def _timed_generate(client: BaseLLMClient, *args) -> dict:
+    stats = provider_stats.setdefault(client.provider, {"calls": 0, "failures": 0, "latency_total": 0.0})
+    start = time.perf_counter()
+    try:
+        return await client.generate_response(*args)
+    except Exception:
+        stats["failures"] += 1
+        raise
+    finally:
+        stats["calls"] += 1
+        stats["latency_total"] += time.perf_counter() - start
+
+
+def _create(name: str, mcp_clients) -> BaseLLMClient:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}'. Registered: {', '.join(PROVIDERS)}")
+    return PROVIDERS[name](mcp_clients)
+
+
+def get_llm_client(mcp_clients=None, provider: str | None = None) -> BaseLLMClient:
     """
     Factory function to get the LLM client instance.
-    For now, it defaults to OpenAIClient.
+
+    `provider` (or LLM_PROVIDER, default "openai") picks the backend from the registry.
+    With LLM_FALLBACK_PROVIDER set (e.g. "rule_based"), failures of the primary backend,
+    including failing to construct it (no API key offline), are served by the fallback.
+    An explicit `provider` is used as-is, without failover, so backends can be benchmarked.
     """
     load_dotenv()
-    # Simply return OpenAIClient for now as it's the only implementation
-    return OpenAIClient(mcp_clients=mcp_clients)
+    name = provider or os.getenv("LLM_PROVIDER", "openai")
+    fallback = None if provider else os.getenv("LLM_FALLBACK_PROVIDER")
+    if not fallback or fallback == name:
+        return FailoverClient([_create(name, mcp_clients)])
+
+    try:
+        primary = _create(name, mcp_clients)
+    except Exception as e:
+        logger.error("LLM provider '%s' unavailable (%s); using '%s'", name, e, fallback)
+        return FailoverClient([_create(fallback, mcp_clients)])
+    return FailoverClient([primary, _create(fallback, mcp_clients)])
+
+
+def provider_latency_stats() -> dict:
+    return {
+        name: {**stats, "avg_latency_s": round(stats["latency_total"] / stats["calls"], 3) if stats["calls"] else None}
+        for name, stats in provider_stats.items()
+    }
+
+
+async def warmup_llm_client():
+    """
+    Pre-open the connections used by the configured LLM backends.
+
+    The backends are constructed in a worker thread: importing the SDK and building
+    its TLS context takes ~0.5s of blocking work that would otherwise stall requests
+    already being served.
+    """
+    client = await asyncio.to_thread(get_llm_client)
+    await client.warmup()
@@ -1,27 +1,102 @@
-from .base import BaseLLMClient
-from openai import OpenAI
+from .base import BaseLLMClient, ProviderCapabilities, ToolSideEffectError
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+import asyncio
 import os
 import logging
 import json
+import time
 from llm.prompts import SYSTEM_PROMPT
 from mcp_integration.client import MCPClient
+from core.session import SessionState
+from core.logging import truncate
+from llm.routing import get_model_router, ModelRouter, classify_request, STAGE_TOOL_SELECTION, STAGE_RESPONSE
+from llm.templates import synthesize_response
 
 logger = logging.getLogger(__name__)
 
-class OpenAIClient(BaseLLMClient):
-    def __init__(self, mcp_clients: list[MCPClient] = None):
-        api_key = os.getenv("OPENAI_API_KEY")
+_sdk_clients: dict[str | None, AsyncOpenAI] = {}
+
+
+def get_sdk_client(base_url: str | None = None, api_key: str | None = None) -> AsyncOpenAI:
+    """
+    Return the process-wide SDK client for an endpoint (None = api.openai.com).
+    Sharing it keeps the underlying HTTP connection pool warm across requests.
+    """
+    if base_url not in _sdk_clients:
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             logger.error("OPENAI_API_KEY is missing from environment variables")
             raise ValueError("OPENAI_API_KEY is not set in environment variables.")
-        
-        self.model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-        logger.info(f"Initializing OpenAIClient with model: {self.model}")
-        self.client = OpenAI(api_key=api_key)
+        _sdk_clients[base_url] = AsyncOpenAI(api_key=api_key, base_url=base_url)
+    return _sdk_clients[base_url]
+
+
+RESPONSE_TEMPLATES_ENABLED = os.getenv("RESPONSE_TEMPLATES_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Errors after which the next model of the route is tried
+FALLBACK_ERRORS = (asyncio.TimeoutError, APITimeoutError, APIConnectionError, InternalServerError, RateLimitError)
+
+
+class OpenAIClient(BaseLLMClient):
+    """
+    Chat-completions backend for api.openai.com and any OpenAI-compatible server
+    (vLLM, llama.cpp, Ollama, ...) selected by `base_url`.
+    """
+    provider = "openai"
+
+    def __init__(self, mcp_clients: list[MCPClient] = None, base_url: str | None = None, api_key: str | None = None,
+                 capabilities: ProviderCapabilities | None = None, router: ModelRouter | None = None, provider: str | None = None):
+        self.router = router or get_model_router()
+        self.client = get_sdk_client(base_url, api_key)
         self.mcp_clients = mcp_clients or []
+        if capabilities is not None:
+            self.capabilities = capabilities
+        if provider is not None:
+            self.provider = provider
+
+    async def warmup(self):
+        await self.client.models.list()
+
+    async def _complete(self, stage: str, request_type: str, **kwargs):
+        """
+        Run a chat completion on the model routed for (stage, request_type),
+        falling back to the next configured model on timeouts and provider outages.
+        """
+        candidates = self.router.candidates(stage, request_type)
+        for attempt, model in enumerate(candidates):
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(model=model, **kwargs),
+                    timeout=self.router.timeout
+                )
+            except FALLBACK_ERRORS as e:
+                timed_out = isinstance(e, (asyncio.TimeoutError, APITimeoutError))
+                self.router.record(stage, request_type, model, time.perf_counter() - start,
+                                   failed=True, timed_out=timed_out, fallback=attempt > 0)
+                if attempt == len(candidates) - 1:
+                    raise
+                logger.warning("Model '%s' failed for %s/%s (%s); falling back to '%s'",
+                               model, stage, request_type, type(e).__name__, candidates[attempt + 1])
+                continue
+            self.router.record(stage, request_type, model, time.perf_counter() - start,
+                               usage=response.usage, fallback=attempt > 0)
+            logger.info("Completion %s/%s on '%s' in %.3fs", stage, request_type, model, time.perf_counter() - start)
+            return response
 
-    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None) -> dict:
+    @staticmethod
+    def _add_usage(usage: dict, response):
+        """Accumulate token usage of a completion into `usage`."""
+        usage["completions"] += 1
+        if getattr(response, "usage", None):
+            usage["prompt_tokens"] += response.usage.prompt_tokens or 0
+            usage["completion_tokens"] += response.usage.completion_tokens or 0
+
+    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None, prefetched_tool_results: dict = None, locale: str = None, session_state: SessionState = None) -> dict:
+        # State-changing tools called so far; a failure after one of them must not be retried elsewhere
+        side_effect_tools = []
         try:
+            prefetched_tool_results = prefetched_tool_results or {}
             messages = [{"role": "system", "content": SYSTEM_PROMPT}]
             if conversation_history:
                 messages.extend(conversation_history)
@@ -45,19 +120,24 @@ class OpenAIClient(BaseLLMClient):
                         })
                         tool_to_client_map[tool.name] = client
                 except Exception as e:
-                    logger.error(f"Failed to list tools from client {client}: {repr(e)}")
+                    logger.error("Failed to list tools from client %s: %r", client, e)
 
-            logger.info(f"Sending request to OpenAI with {len(tools)} tools")
+            logger.info("Sending request to OpenAI with %d tools", len(tools))
             
-            # First API call
-            response = self.client.chat.completions.create(
-                model=self.model,
+            # First API call (tool selection)
+            request_type = classify_request(message)
+            response = await self._complete(
+                STAGE_TOOL_SELECTION, request_type,
                 messages=messages,
-                tools=tools if tools else None,
+                # Backends without function calling get a prompt-only request
+                tools=tools if tools and self.capabilities.tools else None,
             )
             
+            usage = {"prompt_tokens": 0, "completion_tokens": 0, "completions": 0}
+            self._add_usage(usage, response)
             response_message = response.choices[0].message
             tool_calls = response_message.tool_calls
+            tools_used = [tool_call.function.name for tool_call in tool_calls] if tool_calls else []
 
             if tool_calls:
                 messages.append(response_message)
@@ -70,7 +150,7 @@ class OpenAIClient(BaseLLMClient):
                     function_name = tool_call.function.name
                     function_args = json.loads(tool_call.function.arguments)
                     
-                    logger.info(f"Executing tool: {function_name}")
+                    logger.info("Executing tool: %s", function_name)
                     
                     client = tool_to_client_map.get(function_name)
                     if not client:
@@ -79,6 +159,8 @@ class OpenAIClient(BaseLLMClient):
                         try:
                             if context:
                                 function_args.update(context)
+                            if not client.is_read_only(function_name):
+                                side_effect_tools.append(function_name)
                             tool_result = await client.call_tool(function_name, function_args)
                             # Correctly extract text from tool result content
                             function_response = ""
@@ -101,7 +183,7 @@ class OpenAIClient(BaseLLMClient):
                                 tool_results_map[function_name] = function_response
 
                         except Exception as e:
-                            logger.error(f"Tool execution failed: {e}")
+                            logger.error("Tool execution failed: %s", e)
                             function_response = json.dumps({"error": str(e)})
 
                     messages.append({
@@ -134,7 +216,7 @@ class OpenAIClient(BaseLLMClient):
                             
                             if detail_client:
                                 try:
-                                    logger.info(f"Fetching details for product {added_product_id} to find category...")
+                                    logger.info("Fetching details for product %s to find category...", added_product_id)
                                     detail_args = {"productId": added_product_id}
                                     if context: detail_args.update(context)
                                     
@@ -159,12 +241,12 @@ class OpenAIClient(BaseLLMClient):
                                     except:
                                         pass
                                 except Exception as e:
-                                    logger.error(f"Failed to fetch product details for cross-sell: {e}")
+                                    logger.error("Failed to fetch product details for cross-sell: %s", e)
 
                             # 3. Conditional Search
                             if category_name:
                                 search_term = f"{category_name} accessories or related products"
-                                logger.info(f"Cross-Sell: Found category '{category_name}'. Searching for: {search_term}")
+                                logger.info("Cross-Sell: Found category '%s'. Searching for: %s", category_name, search_term)
                                 
                                 search_args = {"term": search_term}
                                 if context: search_args.update(context)
@@ -205,13 +287,27 @@ class OpenAIClient(BaseLLMClient):
                                 except:
                                     pass
                     except Exception as e:
-                        logger.error(f"Cross-selling interceptor failed: {e}")
+                        logger.error("Cross-selling interceptor failed: %s", e)
+                # TEMPLATE SYNTHESIS: purely structured answers (search page, cart, orders)
+                # are rendered from the tool data, skipping the second completion
+                if RESPONSE_TEMPLATES_ENABLED:
+                    synthesized = synthesize_response(tools_used, tool_results_map, locale)
+                    if synthesized:
+                        logger.info("Response for '%s' rendered from template", tools_used[0])
+                        synthesized["tools_used"] = tools_used
+                        synthesized["usage"] = usage
+                        synthesized["synthesized"] = True
+                        return synthesized
+                
                 # Second API call with tool outputs (LLM now only provides message and type)
-                second_response = self.client.chat.completions.create(
-                    model=self.model,
+                # Without JSON mode the system prompt alone asks for JSON; non-JSON replies fall back to text
+                json_mode = {"response_format": { "type": "json_object" }} if self.capabilities.json_mode else {}
+                second_response = await self._complete(
+                    STAGE_RESPONSE, classify_request(message, tools_used),
                     messages=messages,
-                    response_format={ "type": "json_object" }
+                    **json_mode
                 )
+                self._add_usage(usage, second_response)
                 final_content = second_response.choices[0].message.content
             else:
                 final_content = response_message.content
@@ -219,14 +315,16 @@ class OpenAIClient(BaseLLMClient):
 
             # Attempt to parse as JSON and Stitch Data
             try:
-                logger.info(f"Raw LLM Content: {final_content}")
+                logger.debug("Raw LLM Content: %s", truncate(final_content))
                 parsed_response = json.loads(final_content)
                 # Ensure it has the required fields
                 if not isinstance(parsed_response, dict) or "message" not in parsed_response:
                     return {
                         "message": final_content,
                         "type": "text",
-                        "data": None
+                        "data": None,
+                        "tools_used": tools_used,
+                        "usage": usage
                     }
                 
                 # --- HYBRID STITCHING LOGIC ---
@@ -245,6 +343,9 @@ class OpenAIClient(BaseLLMClient):
                     target_tool = type_to_tool[resp_type]
                     if target_tool in tool_results_map:
                         parsed_response["data"] = tool_results_map[target_tool]
+                    elif target_tool in prefetched_tool_results:
+                        # Answered from data the caller prefetched into the prompt
+                        parsed_response["data"] = prefetched_tool_results[target_tool]
                     elif len(tool_results_map) > 0:
                         # Fallback: if specific tool missing but others exist, use the most recent one? 
                         # Or better, just grab the first one that looks like a match?
@@ -263,15 +364,21 @@ class OpenAIClient(BaseLLMClient):
                 if "suggestions" not in parsed_response:
                     parsed_response["suggestions"] = None
 
+                parsed_response["tools_used"] = tools_used
+                parsed_response["usage"] = usage
                 return parsed_response
 
             except json.JSONDecodeError:
                 return {
                     "message": final_content,
                     "type": "text",
-                    "data": None
+                    "data": None,
+                    "tools_used": tools_used,
+                    "usage": usage
                 }
 
         except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
+            logger.error("Error calling OpenAI API: %s", e)
+            if side_effect_tools:
+                raise ToolSideEffectError(side_effect_tools) from e
             raise e
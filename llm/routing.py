@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages that make a completion
+STAGE_TOOL_SELECTION = "tool_selection"
+STAGE_RESPONSE = "response"
+
+# Request types
+TYPE_DEFAULT = "default"
+TYPE_PAGINATION = "pagination"
+TYPE_COMPARISON = "comparison"
+
+# Only explicit phrases: "more"/"weiter" or a bare "better" also occur in ordinary product questions
+_PAGINATION_RE = re.compile(
+    r"\b(?:(?:next|previous|prev|following)\s+page|page\s*\d+|more\s+results"
+    r"|(?:nächsten?|vorherigen?)\s+seite|seite\s*\d+|weitere\s+ergebnisse)\b",
+    re.IGNORECASE,
+)
+_COMPARISON_RE = re.compile(
+    r"\b(?:compar\w*|vs|versus|differences?|better\s+than|which\s+(?:one\s+)?is\s+(?:better|cheaper)"
+    r"|vergleich\w*|unterschied\w*|besser\s+als|welche[rs]?\s+ist\s+(?:besser|günstiger))\b",
+    re.IGNORECASE,
+)
+
+# USD per 1M tokens (input, output); override or extend with LLM_PRICES
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def classify_request(message: str, tools_used: list | None = None) -> str:
+    """Cheap request-type classification used to pick a model route."""
+    if tools_used and tools_used.count("store_product_detail") >= 2:
+        return TYPE_COMPARISON
+    if _COMPARISON_RE.search(message or ""):
+        return TYPE_COMPARISON
+    if _PAGINATION_RE.search(message or ""):
+        return TYPE_PAGINATION
+    return TYPE_DEFAULT
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    fallbacks: int = 0
+    latency_total: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "fallbacks": self.fallbacks,
+            "avg_latency_s": round(self.latency_total / self.calls, 3) if self.calls else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class ModelRouter:
+    """
+    Picks the model per pipeline stage and request type, with ordered fallbacks.
+
+    Configuration (env):
+    - LLM_MODEL: default model for every route (default gpt-4o-mini)
+    - LLM_MODEL_TOOL_SELECTION / LLM_MODEL_RESPONSE: per-stage defaults
+    - LLM_MODEL_COMPARISON: model for comparison answers (response stage)
+    - LLM_ROUTES: JSON {"<stage>": {"<type>": "model"}} overriding the above
+    - LLM_FALLBACK_MODELS: comma-separated models tried after a timeout/outage
+    - LLM_TIMEOUT: per-attempt timeout in seconds
+    - LLM_PRICES: JSON {"model": [input_usd_per_1m, output_usd_per_1m]}
+    """
+    def __init__(self, model: str | None = None):
+        """`model` pins every route to one model without fallbacks (e.g. a local server)."""
+        default = model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.default_model = default
+        if model:
+            self.routes = {}
+            self.fallbacks = []
+        else:
+            tool_selection = os.getenv("LLM_MODEL_TOOL_SELECTION", default)
+            response = os.getenv("LLM_MODEL_RESPONSE", default)
+            self.routes = {
+                STAGE_TOOL_SELECTION: {TYPE_DEFAULT: tool_selection},
+                STAGE_RESPONSE: {
+                    TYPE_DEFAULT: response,
+                    TYPE_COMPARISON: os.getenv("LLM_MODEL_COMPARISON", response),
+                },
+            }
+            for stage, types in json.loads(os.getenv("LLM_ROUTES", "{}")).items():
+                self.routes.setdefault(stage, {}).update(types)
+            self.fallbacks = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.prices = {**DEFAULT_PRICES, **{k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()}}
+        self._stats: dict[tuple[str, str, str], RouteStats] = {}
+
+    def candidates(self, stage: str, request_type: str) -> list[str]:
+        """Primary model for the route followed by its fallbacks (deduplicated)."""
+        stage_routes = self.routes.get(stage, {})
+        primary = stage_routes.get(request_type) or stage_routes.get(TYPE_DEFAULT) or self.default_model
+        return list(dict.fromkeys([primary, *self.fallbacks]))
+
+    def record(self, stage: str, request_type: str, model: str, latency: float, usage=None,
+               failed: bool = False, timed_out: bool = False, fallback: bool = False):
+        stats = self._stats.setdefault((stage, request_type, model), RouteStats())
+        stats.calls += 1
+        stats.latency_total += latency
+        stats.failures += failed
+        stats.timeouts += timed_out
+        stats.fallbacks += fallback
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens or 0
+            completion_tokens = usage.completion_tokens or 0
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            input_price, output_price = self.prices.get(model, (0.0, 0.0))
+            stats.cost_usd += (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    def stats(self) -> list[dict]:
+        return [
+            {"stage": stage, "request_type": request_type, "model": model, **stats.as_dict()}
+            for (stage, request_type, model), stats in sorted(self._stats.items())
+        ]
+
+
+_routers: dict[str, ModelRouter] = {}
+
+
+def get_model_router(provider: str = "openai", model: str | None = None) -> ModelRouter:
+    """Process-wide router per provider (so route accounting survives across requests)."""
+    if provider not in _routers:
+        _routers[provider] = ModelRouter(model)
+    return _routers[provider]
+
+
+def all_route_stats() -> list[dict]:
+    return [
+        {"provider": provider, **row}
+        for provider, router in _routers.items()
+        for row in router.stats()
+    ]
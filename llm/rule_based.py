@@ -0,0 +1,118 @@
+from .base import BaseLLMClient, ProviderCapabilities
+import json
+import logging
+import re
+from mcp_integration.client import MCPClient, tool_result_text
+from core.session import SessionState
+from llm.templates import synthesize_response, supports_locale, localized, localized_suggestion
+
+logger = logging.getLogger(__name__)
+
+_CART_RE = re.compile(r"\b(cart|basket|warenkorb)\b", re.IGNORECASE)
+_ORDER_RE = re.compile(r"\b(orders?|bestellung\w*)\b", re.IGNORECASE)
+# Explicit paging phrases only: "tell me more about X" is a product question, not a next page
+_NEXT_PAGE_RE = re.compile(r"\b(?:next\s+page|more\s+results|nächsten?\s+seite|weitere\s+ergebnisse)\b", re.IGNORECASE)
+_PREVIOUS_PAGE_RE = re.compile(r"\b(?:previous\s+page|vorherigen?\s+seite)\b", re.IGNORECASE)
+_PAGE_RE = re.compile(r"\b(?:page|seite)\s*(\d+)\b", re.IGNORECASE)
+_GREETING_RE = re.compile(r"^\s*(hi|hello|hey|hallo|moin|servus|help|hilfe)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[\wäöüß-]+", re.IGNORECASE)
+
+STOPWORDS = {
+    # en
+    "a", "an", "the", "i", "me", "my", "you", "your", "we", "is", "are", "do", "does", "have", "has",
+    "show", "find", "search", "looking", "look", "for", "want", "need", "please", "some", "any",
+    "can", "could", "would", "to", "of", "in", "on", "with", "and", "or", "get", "give", "list", "what", "which",
+    # de
+    "ein", "eine", "einen", "der", "die", "das", "ich", "mir", "mich", "du", "ihr", "habt", "haben", "hast",
+    "zeig", "zeige", "zeigen", "suche", "such", "finde", "nach", "für", "bitte", "gibt", "es", "mit", "und", "oder",
+}
+
+
+class RuleBasedClient(BaseLLMClient):
+    """
+    In-process, CPU-only backend for offline operation and provider outages.
+
+    Keyword rules map the message to one storefront tool (cart, orders, paginated or
+    free-text product search) and the reply is rendered from the localized templates.
+    Product-page questions are answered from the prefetched product detail.
+    """
+    provider = "rule_based"
+    capabilities = ProviderCapabilities(tools=False, json_mode=True, streaming=False)
+
+    def __init__(self, mcp_clients: list[MCPClient] = None):
+        self.mcp_clients = mcp_clients or []
+
+    async def _call(self, tool_name: str, arguments: dict, context: dict | None):
+        for client in self.mcp_clients:
+            tools = await client.list_tools()
+            if any(tool.name == tool_name for tool in tools):
+                result = await client.call_tool(tool_name, {**arguments, **(context or {})})
+                text = tool_result_text(result)
+                try:
+                    return json.loads(text)
+                except json.JSONDecodeError:
+                    return text
+        raise RuntimeError(f"Tool {tool_name} not available")
+
+    @staticmethod
+    def _search_term(message: str) -> str:
+        words = [w for w in _WORD_RE.findall(message.lower()) if w not in STOPWORDS and not w.isdigit()]
+        return " ".join(words)
+
+    def _plan(self, message: str, session_state: SessionState | None) -> tuple[str, dict] | None:
+        """Pick the single tool call that answers the message, if any."""
+        if _CART_RE.search(message):
+            return "store_cart_get", {}
+        if _ORDER_RE.search(message):
+            return "store_order_list", {}
+        last_term = session_state.search_term if session_state else None
+        if last_term:
+            last_page = session_state.page or 1
+            page_match = _PAGE_RE.search(message)
+            if page_match:
+                return "store_product_search", {"term": last_term, "page": int(page_match.group(1))}
+            if _NEXT_PAGE_RE.search(message):
+                return "store_product_search", {"term": last_term, "page": last_page + 1}
+            if _PREVIOUS_PAGE_RE.search(message):
+                return "store_product_search", {"term": last_term, "page": max(last_page - 1, 1)}
+        term = self._search_term(message)
+        if term and not _GREETING_RE.match(message):
+            return "store_product_search", {"term": term}
+        return None
+
+    async def generate_response(self, message: str, conversation_history: list = None, context: dict = None, prefetched_tool_results: dict = None, locale: str = None, session_state: SessionState = None) -> dict:
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "completions": 0}
+        locale = locale if supports_locale(locale) else "en-GB"
+
+        plan = self._plan(message, session_state)
+        detail = (prefetched_tool_results or {}).get("store_product_detail")
+        if detail and (plan is None or plan[0] == "store_product_search"):
+            # On a product page, free-text questions are about the viewed product
+            return {
+                "message": localized(locale, "product_detail", name=detail.get("name")),
+                "type": "product_detail",
+                "data": detail,
+                "suggestions": [localized_suggestion(locale, "show_cart")],
+                "tools_used": [],
+                "usage": usage,
+                "synthesized": True,
+            }
+        if plan is None:
+            return {
+                "message": localized(locale, "help"),
+                "type": "text",
+                "data": None,
+                "suggestions": [localized_suggestion(locale, "other_search"), localized_suggestion(locale, "show_cart")],
+                "tools_used": [],
+                "usage": usage,
+                "synthesized": True,
+            }
+
+        tool_name, arguments = plan
+        logger.info("Rule-based engine calling '%s'", tool_name)
+        data = await self._call(tool_name, arguments, context)
+        response = synthesize_response([tool_name], {tool_name: data}, locale)
+        if response is None:
+            raise ValueError(f"Cannot render result of '{tool_name}' without an LLM")
+        response.update({"tools_used": [tool_name], "usage": usage, "synthesized": True})
+        return response
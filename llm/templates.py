@@ -0,0 +1,177 @@
+"""
+Template-based response synthesis for purely structured answers.
+
+When the only tool called returns data that the UI renders on its own (a product
+search page, the cart, the order list), the message is a fixed summary of that data
+(see the TYPE-SPECIFIC RULES of the system prompt). It is rendered here from
+localized templates instead of asking the LLM for it in a second completion.
+"""
+
+# Tool -> response type it renders as
+RENDERABLE_TOOLS = {
+    "store_product_search": "product_list",
+    "store_cart_get": "cart_list",
+    "store_order_list": "order_list",
+}
+
+MESSAGES = {
+    "en": {
+        "product_list": "🛍️ I found {total} items. Showing {start}-{end}.",
+        "product_list_empty": "I couldn't find any products for '{term}'. 🔍",
+        "cart_list": "🛒 You have {count} items in your cart.",
+        "cart_list_total": "🛒 You have {count} items in your cart, totalling {total_price}.",
+        "cart_list_empty": "🛒 Your cart is empty.",
+        "order_list": "📦 I found {count} orders.",
+        "order_list_empty": "I couldn't find any orders for your account. 📦",
+        "product_detail": "ℹ️ Here are the details for {name}.",
+        "help": "👋 I can search products, show your cart and list your orders. What are you looking for?",
+    },
+    "de": {
+        "product_list": "🛍️ Ich habe {total} Artikel gefunden. Angezeigt werden {start}-{end}.",
+        "product_list_empty": "Ich konnte keine Produkte zu '{term}' finden. 🔍",
+        "cart_list": "🛒 Du hast {count} Artikel im Warenkorb.",
+        "cart_list_total": "🛒 Du hast {count} Artikel im Warenkorb, insgesamt {total_price}.",
+        "cart_list_empty": "🛒 Dein Warenkorb ist leer.",
+        "order_list": "📦 Ich habe {count} Bestellungen gefunden.",
+        "order_list_empty": "Ich konnte keine Bestellungen zu deinem Konto finden. 📦",
+        "product_detail": "ℹ️ Hier sind die Details zu {name}.",
+        "help": "👋 Ich kann Produkte suchen, deinen Warenkorb zeigen und deine Bestellungen auflisten. Wonach suchst du?",
+    },
+}
+
+SUGGESTIONS = {
+    "en": {
+        "next_page": "Show next page",
+        "sort_price": "Sort by lowest price",
+        "more_about": "Tell me more about {name}",
+        "other_search": "Show me popular products",
+        "checkout": "Checkout",
+        "continue": "Continue shopping",
+        "latest_order": "Show details of my latest order",
+        "show_cart": "Show my cart",
+    },
+    "de": {
+        "next_page": "Nächste Seite anzeigen",
+        "sort_price": "Nach niedrigstem Preis sortieren",
+        "more_about": "Erzähl mir mehr über {name}",
+        "other_search": "Zeig mir beliebte Produkte",
+        "checkout": "Zur Kasse",
+        "continue": "Weiter einkaufen",
+        "latest_order": "Details meiner letzten Bestellung anzeigen",
+        "show_cart": "Meinen Warenkorb anzeigen",
+    },
+}
+
+
+def _language(locale: str | None) -> str | None:
+    """
+    Template language for a Shopware locale code (e.g. de-DE -> de).
+    None if the locale is unknown (the LLM then answers in the user's language) or unsupported.
+    """
+    if not locale:
+        return None
+    language = locale.split("-")[0].lower()
+    return language if language in MESSAGES else None
+
+
+def supports_locale(locale: str | None) -> bool:
+    return _language(locale) is not None
+
+
+def localized(locale: str | None, key: str, **kwargs) -> str:
+    """Message template `key` in the locale's language (English if unsupported)."""
+    return MESSAGES[_language(locale) or "en"][key].format(**kwargs)
+
+
+def localized_suggestion(locale: str | None, key: str, **kwargs) -> str:
+    return SUGGESTIONS[_language(locale) or "en"][key].format(**kwargs)
+
+
+def _first_list(data: dict, *keys) -> list | None:
+    for key in keys:
+        if isinstance(data.get(key), list):
+            return data[key]
+    return None
+
+
+def _product_list(data: dict, messages: dict, suggestions: dict) -> tuple[str, list[str]] | None:
+    results = data.get("results")
+    if not isinstance(results, list):
+        return None
+    if not results:
+        return messages["product_list_empty"].format(term=data.get("searchTerm") or ""), [suggestions["other_search"]]
+
+    pagination = data.get("pagination") or {}
+    page = pagination.get("page") or 1
+    limit = pagination.get("limit") or len(results)
+    start = (page - 1) * limit + 1
+    message = messages["product_list"].format(
+        total=pagination.get("total", len(results)), start=start, end=start + len(results) - 1
+    )
+    if pagination.get("hasNextPage"):
+        follow_ups = [suggestions["next_page"], suggestions["sort_price"]]
+    else:
+        follow_ups = [suggestions["more_about"].format(name=results[0].get("name")), suggestions["sort_price"]]
+    return message, follow_ups
+
+
+def _cart_list(data: dict, messages: dict, suggestions: dict) -> tuple[str, list[str]] | None:
+    items = _first_list(data, "lineItems", "items", "results")
+    if items is None:
+        return None
+    if not items:
+        return messages["cart_list_empty"], [suggestions["other_search"]]
+
+    count = sum(item.get("quantity", 1) if isinstance(item, dict) else 1 for item in items)
+    price = data.get("totalPrice")
+    if price is None and isinstance(data.get("price"), dict):
+        price = data["price"].get("totalPrice")
+    if isinstance(price, (int, float)):
+        message = messages["cart_list_total"].format(count=count, total_price=f"{price:.2f}")
+    else:
+        message = messages["cart_list"].format(count=count)
+    return message, [suggestions["checkout"], suggestions["continue"]]
+
+
+def _order_list(data: dict, messages: dict, suggestions: dict) -> tuple[str, list[str]] | None:
+    orders = _first_list(data, "orders", "results", "elements")
+    if orders is None:
+        return None
+    if not orders:
+        return messages["order_list_empty"], [suggestions["continue"]]
+    return messages["order_list"].format(count=len(orders)), [suggestions["latest_order"], suggestions["continue"]]
+
+
+RENDERERS = {
+    "product_list": _product_list,
+    "cart_list": _cart_list,
+    "order_list": _order_list,
+}
+
+
+def synthesize_response(tools_used: list, tool_results_map: dict, locale: str | None = None) -> dict | None:
+    """
+    Render the final response from tool output without an LLM call.
+
+    Returns None (caller falls back to the LLM) unless exactly one renderable tool was
+    called, it returned structured data without an error, and the locale is given and
+    has templates.
+    """
+    if len(tools_used) != 1 or tools_used[0] not in RENDERABLE_TOOLS or len(tool_results_map) != 1:
+        return None
+    language = _language(locale)
+    data = tool_results_map.get(tools_used[0])
+    if language is None or not isinstance(data, dict) or "error" in data:
+        return None
+
+    resp_type = RENDERABLE_TOOLS[tools_used[0]]
+    rendered = RENDERERS[resp_type](data, MESSAGES[language], SUGGESTIONS[language])
+    if rendered is None:
+        return None
+    message, suggestions = rendered
+    return {
+        "message": message,
+        "type": resp_type,
+        "data": data,
+        "suggestions": suggestions[:2],
+    }
@@ -1,15 +1,24 @@
+import time
+_IMPORT_START = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Load env vars before the app imports: modules read settings (LOG_*, CACHE_*) at import time
+load_dotenv()
+
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from api.main import app_router
-from core.logging import setup_logging
+from core.logging import setup_logging, shutdown_logging, request_id_var, new_request_id
+from core.warmup import StartupState, run_warmup
+from core.cache import get_cache
+import asyncio
 import logging
 
 from mcp_integration.client import MCPClient
-from dotenv import load_dotenv
 import os
 
-# Load env vars
-load_dotenv()
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,25 +26,36 @@ async def lifespan(app: FastAPI):
     logger = logging.getLogger(__name__)
     logger.info("Application startup: Logging initialized")
     
+    # Shared cache tier (first worker hosts the daemon, the others connect to it)
+    await get_cache().start()
+    
     # Initialize Shopware Store MCP Client (Storefront)
     mcp_url = os.getenv("MCP_SERVER_URL", "http://localhost:3334/sse")
     shopware_store_client = MCPClient(mcp_url)
-    try:
-        await shopware_store_client.connect()
-    except Exception as e:
-        logger.error(f"Failed to connect to Shopware Store MCP: {e}")
-    # logger.info("Skipping Shopware Store MCP connection for debugging")
     
     # Store in a list for multi-client support
     app.state.mcp_clients = [shopware_store_client]
     
+    # Start serving immediately; MCP/LLM connections are warmed up in the background
+    app.state.startup = StartupState(import_seconds=round(IMPORT_SECONDS, 3))
+    warmup_task = asyncio.create_task(run_warmup(app.state.startup, app.state.mcp_clients))
+    logger.info("Application startup: serving (imports took %.3fs), warmup running", IMPORT_SECONDS)
+    
     yield
     
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+
     # Disconnect all clients
     for client in app.state.mcp_clients:
-        await client.disconnect()
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.error("Failed to disconnect MCP client: %s", e)
 
+    await get_cache().close()
     logger.info("Application shutdown")
+    shutdown_logging()
 
 app = FastAPI(title="AI Customer Support Agent", lifespan=lifespan)
 
@@ -49,4 +69,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag every log record of a request with a correlation ID (X-Request-ID)."""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 app.include_router(app_router)
@@ -1,3 +1,3 @@
-from .client import MCPClient
+from .client import MCPClient, tool_result_text
 
-__all__ = ["MCPClient"]
+__all__ = ["MCPClient", "tool_result_text"]
@@ -3,16 +3,52 @@ from mcp.client.session import ClientSession
 import logging
 import os
 import asyncio
+import hashlib
+import json
+from core.cache import get_cache
+from core.logging import truncate, sample_payload
 from dataclasses import dataclass
 from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Read-only tools whose results may be served from the shared cache
+CACHEABLE_TOOLS = {
+    name.strip()
+    for name in os.getenv("MCP_CACHEABLE_TOOLS", "store_product_search,store_product_detail,store_category_list").split(",")
+    if name.strip()
+}
+# Tools without side effects; a failed turn that only ran these may be retried on another LLM backend
+READ_ONLY_TOOLS = {
+    name.strip()
+    for name in os.getenv(
+        "MCP_READ_ONLY_TOOLS",
+        "store_product_search,store_product_detail,store_category_list,store_cart_get,store_order_list"
+    ).split(",")
+    if name.strip()
+}
+TOOL_RESULT_CACHE_TTL = float(os.getenv("TOOL_RESULT_CACHE_TTL", "30"))
+TOOL_CATALOG_CACHE_TTL = float(os.getenv("TOOL_CATALOG_CACHE_TTL", "300"))
+
 @dataclass
 class StoreCredentials:
     shop_url: str
     client_id: str
 
+def tool_result_text(result) -> str:
+    """Concatenate the text parts of an MCP tool result."""
+    if not hasattr(result, 'content'):
+        return str(result)
+    text = ""
+    for content in result.content:
+        if hasattr(content, 'text'):
+            text += content.text
+        elif isinstance(content, dict) and 'text' in content:
+            text += content['text']
+        else:
+            text += str(content)
+    return text
+
 class MCPClient:
     """
     Manages the connection to the Shopware MCP server via SSE.
@@ -20,10 +56,13 @@ class MCPClient:
     def __init__(self, sse_url: str = "http://localhost:3334/sse"):
         self.sse_url = sse_url
         self.session: ClientSession | None = None
-        self._exit_stack = None
+        self._connection_task: asyncio.Task | None = None
+        self._closing: asyncio.Event | None = None
         self._lock = asyncio.Lock()
         self.stores: Dict[str, StoreCredentials] = {}
         self.active_store_name: Optional[str] = None
+        # Tool catalog is static for the lifetime of the MCP server; cache it across reconnects
+        self._tools_cache = None
         
         # Initialize default store from environment if available
         default_url = os.getenv("SHOPWARE_API_URL")
@@ -36,46 +75,66 @@ class MCPClient:
     def add_store(self, name: str, shop_url: str, client_id: str):
         """Add a new store configuration."""
         self.stores[name] = StoreCredentials(shop_url, client_id)
-        logger.info(f"Added store '{name}'")
+        logger.info("Added store '%s'", name)
 
     def set_active_store(self, name: str):
         """Set the active store for subsequent tool calls."""
         if name not in self.stores:
             raise ValueError(f"Store '{name}' not found")
         self.active_store_name = name
-        logger.info(f"Set active store to '{name}'")
+        logger.info("Set active store to '%s'", name)
 
     async def connect(self):
-        """Establish connection to the MCP server."""
+        """
+        Establish connection to the MCP server.
+
+        The SSE stream and the session are opened and closed by one dedicated task
+        (`_run_connection`): their anyio cancel scopes must be exited by the task that
+        entered them, whichever request or warmup step triggered the connect.
+        """
+        if self._connection_task:
+            await self.disconnect()
+
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._connection_task = asyncio.create_task(self._run_connection(ready, self._closing))
+        try:
+            await ready
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                logger.error("Failed to connect to MCP server: %s", e)
+            await self.disconnect()
+            raise
+        logger.info("Connected to MCP server at %s", self.sse_url)
+
+    async def _run_connection(self, ready: asyncio.Future, closing: asyncio.Event):
+        """Own the SSE stream and session until `closing` is set."""
         try:
-            from contextlib import AsyncExitStack
-            self._exit_stack = AsyncExitStack()
-            
-            # Connect using sse_client context manager
             # timeout=5.0 sets connect/pool timeouts
             # sse_read_timeout=None disables the read timeout (infinite)
-            read_stream, write_stream = await self._exit_stack.enter_async_context(
-                sse_client(self.sse_url, timeout=5.0, sse_read_timeout=None)
-            )
-            
-            # Start the session
-            self.session = await self._exit_stack.enter_async_context(
-                ClientSession(read_stream, write_stream)
-            )
-            
-            await self.session.initialize()
-            logger.info(f"Connected to MCP server at {self.sse_url}")
-            
+            async with sse_client(self.sse_url, timeout=5.0, sse_read_timeout=None) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    await closing.wait()
         except Exception as e:
-            logger.error(f"Failed to connect to MCP server: {e}")
-            await self.disconnect()
-            raise
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error("MCP connection closed with error: %s", e)
+        finally:
+            self.session = None
 
     async def disconnect(self):
-        """Close the connection."""
-        if self._exit_stack:
-            await self._exit_stack.aclose()
-            self._exit_stack = None
+        """Close the connection and wait for the connection task to release it."""
+        task, self._connection_task = self._connection_task, None
+        if task:
+            if self.session is None:
+                # Still connecting: nothing to close gracefully
+                task.cancel()
+            self._closing.set()
+            await asyncio.gather(task, return_exceptions=True)
         self.session = None
         logger.info("Disconnected from MCP server")
 
@@ -93,35 +152,85 @@ class MCPClient:
             try:
                 await self.connect()
             except Exception as e:
-                logger.error(f"Reconnection failed: {e}")
+                logger.error("Reconnection failed: %s", e)
                 raise
 
-    async def list_tools(self):
-        """List available tools from the MCP server."""
+    @property
+    def is_connected(self) -> bool:
+        return self.session is not None
+
+    @property
+    def cached_tools(self):
+        return self._tools_cache
+
+    def is_read_only(self, name: str) -> bool:
+        """True for tools listed in READ_ONLY_TOOLS or annotated readOnlyHint by the server."""
+        if name in READ_ONLY_TOOLS:
+            return True
+        tool = next((t for t in self._tools_cache or [] if t.name == name), None)
+        annotations = getattr(tool, "annotations", None)
+        return bool(annotations and annotations.readOnlyHint)
+
+    def has_tool(self, name: str) -> bool:
+        """Check the cached tool catalog for a tool (False if the catalog is not loaded yet)."""
+        return any(tool.name == name for tool in self._tools_cache or [])
+
+    async def list_tools(self, refresh: bool = False):
+        """List available tools from the MCP server (cached after the first successful call)."""
+        if self._tools_cache is not None and not refresh:
+            return self._tools_cache
+
+        # Another worker may already have fetched the catalog
+        catalog_key = f"mcp:tools:{self.sse_url}"
+        if not refresh:
+            cached = await get_cache().get(catalog_key)
+            if cached is not None:
+                from mcp.types import Tool
+                self._tools_cache = [Tool.model_validate(tool) for tool in cached]
+                return self._tools_cache
+
         await self.ensure_connected()
         
         try:
             result = await self.session.list_tools()
+            self._tools_cache = result.tools
+            await self._share_catalog(catalog_key)
             return result.tools
         except Exception as e:
             # For list_tools, we can be aggressive with retries because it's a read-only op
             # and critical for the system to work.
-            logger.warning(f"Error during list_tools ({type(e).__name__}: {e}). Reconnecting and retrying...")
+            logger.warning("Error during list_tools (%s: %s). Reconnecting and retrying...", type(e).__name__, e)
             await self.disconnect()
             await self.ensure_connected()
             
             # Retry once
             try:
                 result = await self.session.list_tools()
+                self._tools_cache = result.tools
+                await self._share_catalog(catalog_key)
                 return result.tools
             except Exception as retry_e:
-                logger.error(f"Retry failed for list_tools: {retry_e}")
+                logger.error("Retry failed for list_tools: %s", retry_e)
                 raise retry_e
 
+    async def _share_catalog(self, catalog_key: str):
+        await get_cache().set(
+            catalog_key,
+            [tool.model_dump(mode="json") for tool in self._tools_cache],
+            TOOL_CATALOG_CACHE_TTL
+        )
+
+    @staticmethod
+    def _result_cache_key(name: str, arguments: dict) -> str:
+        digest = hashlib.sha1(json.dumps(arguments, sort_keys=True, default=str).encode()).hexdigest()
+        return f"mcp:call:{name}:{digest}"
+
+    async def _cache_result(self, cache_key: str | None, result):
+        if cache_key and not getattr(result, "isError", False):
+            await get_cache().set(cache_key, tool_result_text(result), TOOL_RESULT_CACHE_TTL)
+
     async def call_tool(self, name: str, arguments: dict):
-        """Call a specific tool on the MCP server."""
-        await self.ensure_connected()
-        
+        """Call a specific tool on the MCP server (read-only tools are served from the shared cache)."""
         # Inject active store credentials
         if self.active_store_name:
             creds = self.stores[self.active_store_name]
@@ -139,9 +248,25 @@ class MCPClient:
         else:
              logger.warning("No active store set. Tool call might fail if credentials are required.")
 
+        # Arguments include shop, access key and context token, so cached results never cross stores or customers
+        cache_key = self._result_cache_key(name, arguments) if name in CACHEABLE_TOOLS else None
+        if cache_key:
+            cached = await get_cache().get(cache_key)
+            if cached is not None:
+                from mcp.types import CallToolResult, TextContent
+                logger.info("MCP tool '%s' served from cache", name)
+                return CallToolResult(content=[TextContent(type="text", text=cached)])
+
+        await self.ensure_connected()
+
         import time
         start_time = time.perf_counter()
-        logger.info(f"Calling MCP tool '{name}' with args: {arguments}")
+        if sample_payload():
+            # Credentials are injected above; never log them
+            safe_args = {k: v for k, v in arguments.items() if k not in ("swAccessKey", "swContextToken")}
+            logger.info("Calling MCP tool '%s' with args: %s", name, truncate(safe_args))
+        else:
+            logger.info("Calling MCP tool '%s'", name)
         
         try:
             # Set a timeout for the tool call to prevent hanging indefinitely
@@ -149,7 +274,8 @@ class MCPClient:
             result = await asyncio.wait_for(self.session.call_tool(name, arguments), timeout=timeout_seconds)
             
             duration = time.perf_counter() - start_time
-            logger.info(f"MCP tool '{name}' executed in {duration:.3f}s")
+            logger.info("MCP tool '%s' executed in %.3fs", name, duration)
+            await self._cache_result(cache_key, result)
             return result
         except Exception as e:
             # Check for connection-related errors or timeouts
@@ -158,7 +284,7 @@ class MCPClient:
             
             if is_timeout or "connection" in error_msg or "broken pipe" in error_msg or "closed" in error_msg:
                 reason = "Timeout" if is_timeout else "Connection lost"
-                logger.warning(f"{reason} during tool call '{name}'. Reconnecting and retrying...")
+                logger.warning("%s during tool call '%s'. Reconnecting and retrying...", reason, name)
                 await self.disconnect()
                 await self.ensure_connected()
                 
@@ -166,12 +292,13 @@ class MCPClient:
                 try:
                     result = await asyncio.wait_for(self.session.call_tool(name, arguments), timeout=timeout_seconds)
                     duration = time.perf_counter() - start_time
-                    logger.info(f"MCP tool '{name}' executed successfully after retry in {duration:.3f}s")
+                    logger.info("MCP tool '%s' executed successfully after retry in %.3fs", name, duration)
+                    await self._cache_result(cache_key, result)
                     return result
                 except Exception as retry_e:
-                    logger.error(f"Retry failed for tool '{name}': {retry_e}")
+                    logger.error("Retry failed for tool '%s': %s", name, retry_e)
                     raise retry_e
             
             duration = time.perf_counter() - start_time
-            logger.error(f"MCP tool '{name}' failed after {duration:.3f}s: {e}")
+            logger.error("MCP tool '%s' failed after %.3fs: %s", name, duration, e)
             raise e
@@ -1,4 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+class PageContext(BaseModel):
+    # Frontends may send additional page fields; keep them instead of rejecting the request
+    model_config = ConfigDict(extra="allow")
+
+    productId: str | None = Field(None, description="ID of the product the user is viewing, if on a product page.")
+    productName: str | None = Field(None, description="Name of the product the user is viewing.")
 
 class ChatRequest(BaseModel):
     message: str = Field(..., description="The user's query or input message.", example="Find me a red t-shirt")
@@ -7,7 +14,7 @@ class ChatRequest(BaseModel):
     swLanguageId: str | None = Field(None, description="Shopware Language ID for translation context.", example="2fbb5fe2e29a4d70aa5854ce7ce3e20b")
     swLanguageCode: str | None = Field(None, description="Shopware Locale Code for LLM language instruction.", example="en-GB")
     shopUrl: str | None = Field(None, description="Base URL of the shop.", example="http://localhost:8000")
-    pageContext: dict | None = Field(None, description="Current frontend state (e.g. active product).", example={"productId": "uuid...", "productName": "T-Shirt"})
+    pageContext: PageContext | None = Field(None, description="Current frontend state (e.g. active product).", example={"productId": "uuid...", "productName": "T-Shirt"})
 
 class ChatResponse(BaseModel):
     message: str = Field(..., description="The AI's response message.")
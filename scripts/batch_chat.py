@@ -0,0 +1,64 @@
+"""
+Run a JSONL file of conversations through the chat pipeline in-process.
+
+Usage:
+    python scripts/batch_chat.py requests.jsonl --concurrency 8 > results.jsonl
+    python scripts/batch_chat.py requests.jsonl --provider rule_based > offline.jsonl
+
+Uses the same pipeline as POST /chat/batch (shared MCP tool catalog, sessions
+isolated per conversation). Needs OPENAI_API_KEY and MCP_SERVER_URL like the server.
+Results go to stdout (or --output), logs to stderr.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Before the app imports: modules read settings such as CACHE_SOCKET at import time
+load_dotenv()
+
+from core.logging import setup_logging
+from mcp_integration.client import MCPClient
+from api.routes.batch import run_batch, BATCH_CONCURRENCY
+
+
+async def main(path: str, concurrency: int, provider: str | None, output):
+    mcp_client = MCPClient(os.getenv("MCP_SERVER_URL", "http://localhost:3334/sse"))
+    await mcp_client.connect()
+    await mcp_client.list_tools()
+
+    start = time.perf_counter()
+    count = 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            async for result in run_batch(f.readlines(), [mcp_client], concurrency, provider):
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                count += 1
+    finally:
+        await mcp_client.disconnect()
+    print(f"{count} conversations in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="JSONL file of conversations")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--provider", default=None, help="LLM backend (openai, openai_compatible, rule_based)")
+    parser.add_argument("--output", "-o", default=None, help="write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Keep stdout clean for the JSONL results
+    setup_logging(stream=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            asyncio.run(main(args.path, args.concurrency, args.provider, output))
+    else:
+        asyncio.run(main(args.path, args.concurrency, args.provider, sys.stdout))
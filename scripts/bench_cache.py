@@ -0,0 +1,89 @@
+"""
+Compare cache hit rates with 1 vs N worker processes, with and without the shared tier.
+
+Usage:
+    python scripts/bench_cache.py --workers 4 --requests 5000 --keys 2000
+
+Each worker replays the same skewed (Zipf-like) key workload: on a miss it "fetches"
+the value upstream and writes it to the cache. Upstream fetches are what an MCP call
+would cost; fewer is better.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cache import SharedCache
+
+
+async def worker_main(socket_path, seed, requests, keys, start_delay):
+    cache = SharedCache(socket_path, l1_ttl=60)
+    await cache.start()
+    await asyncio.sleep(start_delay)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    upstream = 0
+    started = time.perf_counter()
+    for key_id in rng.choices(range(keys), weights=weights, k=requests):
+        key = f"product:{key_id}"
+        if await cache.get(key) is None:
+            upstream += 1
+            await cache.set(key, {"id": key_id, "name": f"Product {key_id}"}, ttl=60)
+    elapsed = time.perf_counter() - started
+    stats = cache.as_dict()
+    await asyncio.sleep(0.2)
+    await cache.close()
+    return stats, upstream, elapsed
+
+
+def run_worker(args, queue):
+    queue.put(asyncio.run(worker_main(*args)))
+
+
+def run(workers, shared, requests, keys):
+    socket_path = os.path.join(tempfile.mkdtemp(), "cache.sock") if shared else None
+    queue = multiprocessing.Queue()
+    procs = [
+        # Stagger workers slightly so the first one hosts the daemon before the rest connect
+        multiprocessing.Process(target=run_worker, args=((socket_path, i, requests, keys, 0.5), queue))
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    totals = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+    upstream = 0
+    elapsed = 0.0
+    for stats, fetches, seconds in results:
+        for key in totals:
+            totals[key] += stats[key]
+        upstream += fetches
+        elapsed = max(elapsed, seconds)
+    lookups = sum(totals.values())
+    label = f"{workers} worker(s), {'L1+shared L2' if shared else 'L1 only     '}"
+    print(
+        f"{label}: hit rate {(totals['l1_hits'] + totals['l2_hits']) / lookups:.1%} "
+        f"(L1 {totals['l1_hits']}, L2 {totals['l2_hits']}, miss {totals['misses']}), "
+        f"upstream fetches {upstream}, {lookups / elapsed:,.0f} lookups/s per worker"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5000, help="lookups per worker")
+    parser.add_argument("--keys", type=int, default=2000)
+    args = parser.parse_args()
+
+    for workers in (1, args.workers):
+        for shared in (False, True):
+            run(workers, shared, args.requests, args.keys)
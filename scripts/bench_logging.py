@@ -0,0 +1,58 @@
+"""
+Measure per-request logging overhead on the calling thread.
+
+Usage:
+    LOG_ENABLED=true  python scripts/bench_logging.py > /dev/null
+    LOG_ENABLED=false python scripts/bench_logging.py > /dev/null
+
+Results are printed to stderr so stdout (the log sink) can be discarded.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.logging import setup_logging, shutdown_logging, truncate
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20000"))
+
+MESSAGE = "Find me a red t-shirt in size XL under 30 euros " * 4
+LLM_CONTENT = '{"message": "I found 3 items.", "type": "product_list", "suggestions": []}' * 40
+TOOL_ARGS = {"term": "t-shirt", "page": 1, "limit": 10, "shopUrl": "https://shop.example"}
+
+
+def simulate_request(logger):
+    # Mirrors the log calls made along the chat -> LLM -> MCP path
+    logger.info("Received chat message: %s", truncate(MESSAGE))
+    logger.debug("PageContext: %s", truncate({"productId": "0199951287f071ac9740514c9abbe40e"}))
+    logger.info("Injected Language Instruction: %s", "de-DE")
+    logger.info("Sending request to OpenAI with %d tools", 12)
+    logger.info("Executing tool: %s", "store_product_search")
+    logger.info("Calling MCP tool '%s' with args: %s", "store_product_search", truncate(TOOL_ARGS))
+    logger.info("MCP tool '%s' executed in %.3fs", "store_product_search", 0.123)
+    logger.debug("Raw LLM Content: %s", truncate(LLM_CONTENT))
+    logger.info("Assistant response: %s", truncate(MESSAGE))
+
+
+def main():
+    setup_logging()
+    logger = logging.getLogger("bench")
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        simulate_request(logger)
+    elapsed = time.perf_counter() - start
+    shutdown_logging()
+
+    enabled = os.getenv("LOG_ENABLED", "true")
+    print(
+        f"LOG_ENABLED={enabled} LOG_FORMAT={os.getenv('LOG_FORMAT', 'json')}: "
+        f"{ITERATIONS} requests in {elapsed:.3f}s -> {elapsed / ITERATIONS * 1e6:.1f}us/request on caller",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
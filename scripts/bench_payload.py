@@ -0,0 +1,67 @@
+"""
+Measure chat response bytes on the wire and serialization time per response type.
+
+Usage:
+    python scripts/bench_payload.py
+
+Uses search_result.json as the product_list sample and derives product_detail and
+cart_list samples from it. Brotli rows appear when the `brotli` package is installed.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.payload import RESPONSE_PROFILES, project_data, compress, brotli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ITERATIONS = 2000
+
+with open(os.path.join(ROOT, "search_result.json")) as f:
+    SEARCH = json.load(f)
+
+CONTEXT = SEARCH["context"]
+PRODUCT = {**SEARCH["data"]["results"][0], "description": "<p>Warm, waterproof winter jacket.</p>" * 40, "properties": [{"group": "Material", "option": "Wool"}] * 8}
+SAMPLES = {
+    "product_list": SEARCH["data"],
+    "product_detail": PRODUCT,
+    "cart_list": {"lineItems": [{**item, "quantity": 1} for item in SEARCH["data"]["results"]], "price": {"totalPrice": 299.0}},
+}
+
+
+def response_body(resp_type, data, echo_context):
+    return {
+        "message": "I found 3 items. Showing 1-3.",
+        "type": resp_type,
+        "suggestions": ["Show next page"],
+        "data": data,
+        "context": CONTEXT if echo_context else None,
+    }
+
+
+def measure(resp_type, data, profile, echo_context, encoding):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        projected = project_data(resp_type, data, RESPONSE_PROFILES[profile])
+        body = json.dumps(response_body(resp_type, projected, echo_context), ensure_ascii=False).encode()
+        sent, _ = compress(body, encoding)
+    per_response_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+    return len(body), len(sent), per_response_us
+
+
+def main():
+    encodings = [None, "gzip"] + (["br"] if brotli else [])
+    print(f"{'type':<15}{'variant':<32}{'json B':>8}{'wire B':>8}{'us/resp':>9}")
+    for resp_type, data in SAMPLES.items():
+        variants = [("full", True, None)]  # previous behaviour: full data, context echoed, uncompressed
+        variants += [(profile, False, enc) for profile in RESPONSE_PROFILES for enc in encodings]
+        for profile, echo_context, encoding in variants:
+            json_bytes, wire_bytes, us = measure(resp_type, data, profile, echo_context, encoding)
+            label = f"{profile}{' +context echo' if echo_context else ''} / {encoding or 'identity'}"
+            print(f"{resp_type:<15}{label:<32}{json_bytes:>8}{wire_bytes:>8}{us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure per-session memory of the in-memory chat sessions.
+
+Usage:
+    python scripts/bench_session_memory.py --sessions 2000 --turns 20
+
+"before" mirrors the previous layout: an unbounded list of {"role", "content"} dicts
+plus a dict-based state holding the active product detail as a nested dict.
+"after" is core.session.Session: slotted records, interned roles, a ring buffer
+bounded to CHAT_HISTORY_LIMIT and the product detail kept as compact JSON text.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.session import Session, ROLE_USER, ROLE_ASSISTANT
+
+HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "6"))
+
+with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "search_result.json")) as f:
+    SEARCH_DATA = json.load(f)["data"]
+DETAIL = {**SEARCH_DATA["results"][0], "description": "Warm, waterproof winter jacket. " * 30}
+
+
+def conversation(session_no: int, turns: int):
+    for turn in range(turns):
+        yield (
+            f"Session {session_no}: do you have this jacket in size {turn}?",
+            f"I found {turn + 3} items. Showing 1-3. 🛍️ (session {session_no})",
+        )
+
+
+def build_before(count: int, turns: int) -> dict:
+    sessions = {}
+    for n in range(count):
+        session = {"history": [], "state": {"active_product": None, "displayed_items": []}}
+        for user_msg, assistant_msg in conversation(n, turns):
+            session["history"].append({"role": "user", "content": user_msg})
+            session["history"].append({"role": "assistant", "content": assistant_msg})
+        session["state"]["active_product"] = {"id": DETAIL["id"], "name": DETAIL["name"], "detail": json.loads(json.dumps(DETAIL))}
+        session["state"]["displayed_items"] = [(r["id"], r["name"]) for r in SEARCH_DATA["results"]]
+        sessions[f"token-{n}"] = session
+    return sessions
+
+
+def build_after(count: int, turns: int) -> dict:
+    sessions = {}
+    for n in range(count):
+        session = Session.create(HISTORY_LIMIT)
+        for user_msg, assistant_msg in conversation(n, turns):
+            session.add_message(ROLE_USER, user_msg)
+            session.add_message(ROLE_ASSISTANT, assistant_msg)
+        session.state.update_from_response("product_list", SEARCH_DATA)
+        session.state.set_active_product(DETAIL["id"], DETAIL["name"], detail=json.loads(json.dumps(DETAIL)))
+        sessions[f"token-{n}"] = session
+    return sessions
+
+
+def measure(build, count: int, turns: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    sessions = build(count, turns)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    return current / count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    before = measure(build_before, args.sessions, args.turns)
+    after = measure(build_after, args.sessions, args.turns)
+    print(f"{args.sessions} sessions x {args.turns} turns (history limit {HISTORY_LIMIT})")
+    print(f"  before: {before / 1024:.1f} KiB/session")
+    print(f"  after:  {after / 1024:.1f} KiB/session ({after / before:.0%})")
@@ -0,0 +1,121 @@
+"""
+Measure cold-start cost of the application and its heavy dependencies.
+
+Usage:
+    python scripts/bench_startup.py [--serve] [--runs N] [--port PORT]
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and reports the
+cumulative import time of the top-level packages. `openai` is imported by the
+background warmup, not by `import main`, so its cost is reported separately.
+
+With --serve it also launches uvicorn N times and reports the median time until
+/health answers (serving) and until /health/ready returns 200 (MCP connected,
+tools loaded). MCP_SERVER_URL must point at a reachable MCP server for the latter.
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGES = ("main", "fastapi", "mcp", "openai", "pydantic", "dotenv", "httpx")
+
+
+def import_times(statement: str) -> tuple[float, dict]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else "import failed", file=sys.stderr)
+        sys.exit(proc.returncode)
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue
+        name = parts[2].strip()
+        if name in PACKAGES:
+            cumulative[name] = max(cumulative.get(name, 0), int(parts[1]))
+    return wall, cumulative
+
+
+def _status(port: int, path: str) -> int | None:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def _wait_for(port: int, path: str, start: float, timeout: float = 60.0) -> float | None:
+    while time.perf_counter() - start < timeout:
+        if _status(port, path) == 200:
+            return time.perf_counter() - start
+        time.sleep(0.005)
+    return None
+
+
+def serve_times(runs: int, port: int) -> tuple[list[float], list[float]]:
+    env = {**os.environ, "LOG_ENABLED": "false"}
+    live, ready = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            live_s = _wait_for(port, "/health", start)
+            ready_s = _wait_for(port, "/health/ready", start)
+        finally:
+            proc.send_signal(signal.SIGINT)
+            proc.wait()
+        if live_s is not None:
+            live.append(live_s)
+        if ready_s is not None:
+            ready.append(ready_s)
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", action="store_true", help="also measure time to serving/ready")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    wall, cumulative = import_times("import main")
+    print(f"interpreter + import main: {wall:.3f}s wall")
+    for name in PACKAGES:
+        if name in cumulative:
+            print(f"  {name:<10} {cumulative[name] / 1e6:.3f}s cumulative")
+    _, deferred = import_times("import openai")
+    if "openai" not in cumulative and "openai" in deferred:
+        print(f"  {'openai':<10} {deferred['openai'] / 1e6:.3f}s (imported by the warmup thread)")
+
+    if args.serve:
+        live, ready = serve_times(args.runs, args.port)
+        if live:
+            print(f"serving (/health 200):      median {statistics.median(live):.3f}s over {len(live)} runs")
+        if ready:
+            print(f"ready (/health/ready 200):  median {statistics.median(ready):.3f}s over {len(ready)} runs")
+        else:
+            print("ready: /health/ready never returned 200 (is MCP_SERVER_URL reachable?)")
+
+
+if __name__ == "__main__":
+    main()
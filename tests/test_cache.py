@@ -0,0 +1,119 @@
+import asyncio
+
+import core.cache
+from core.cache import SharedCache
+
+
+async def _cancel_in_flight(cache: SharedCache, key: str):
+    """Start a lookup, let it write its request, then cancel it before it reads the reply."""
+    task = asyncio.create_task(cache.get(key))
+    while not cache._lock.locked():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_cancelled_get_does_not_answer_the_next_lookup(tmp_path):
+    async def scenario():
+        writer = SharedCache(str(tmp_path / "cache.sock"))
+        reader = SharedCache(str(tmp_path / "cache.sock"))
+        await writer.start()
+        await reader.start()
+        try:
+            await writer.set("customerA", "secret-A", 60)
+            await writer.set("customerB", "secret-B", 60)
+
+            await _cancel_in_flight(reader, "customerA")
+
+            assert await reader.get("customerB") == "secret-B"
+            assert await reader.get("customerA") == "secret-A"
+            assert reader.l2_connected
+        finally:
+            await reader.close()
+            await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_socket_in_shared_directory_is_refused(tmp_path):
+    shared_dir = tmp_path / "shared"
+    shared_dir.mkdir(mode=0o777)
+    shared_dir.chmod(0o777)
+
+    async def scenario():
+        cache = SharedCache(str(shared_dir / "cache.sock"))
+        await cache.start()
+        try:
+            assert not cache.l2_connected
+            assert cache.daemon is None
+            await cache.set("key", "value", 60)
+            assert await cache.get("key") == "value"
+        finally:
+            await cache.close()
+
+    asyncio.run(scenario())
+    assert not (shared_dir / "cache.sock").exists()
+
+
+async def _accepted(host: SharedCache, connections: int):
+    """Wait until the daemon has accepted the workers' request and subscriber connections."""
+    while len(host.daemon.clients) < connections:
+        await asyncio.sleep(0.01)
+
+
+def test_host_closes_while_another_worker_is_connected(tmp_path):
+    async def scenario():
+        host = SharedCache(str(tmp_path / "cache.sock"))
+        other = SharedCache(str(tmp_path / "cache.sock"))
+        await host.start()
+        await other.start()
+        try:
+            assert host.daemon is not None and other.l2_connected
+            await _accepted(host, 4)
+            await asyncio.wait_for(host.close(), 2)
+            assert not (tmp_path / "cache.sock").exists()
+        finally:
+            await other.close()
+            await host.close()
+
+    asyncio.run(scenario())
+
+
+def _listeners() -> int:
+    return sum(1 for task in asyncio.all_tasks() if task.get_coro().__qualname__ == "SharedCache._listen")
+
+
+def test_concurrent_requests_after_daemon_restart_reconnect_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.cache, "L2_RETRY_SECONDS", 0)
+
+    async def scenario():
+        old_host = SharedCache(str(tmp_path / "cache.sock"))
+        worker = SharedCache(str(tmp_path / "cache.sock"))
+        new_host = SharedCache(str(tmp_path / "cache.sock"))
+        await old_host.start()
+        await worker.start()
+        try:
+            await _accepted(old_host, 4)
+            await old_host.close()
+            assert await worker.get("key") is None
+            assert not worker.l2_connected
+
+            await new_host.start()
+            await new_host.set("key", "value", 60)
+            # Requests during the outage do not wait for the reconnect
+            assert await asyncio.gather(*(worker.get("key") for _ in range(5))) == [None] * 5
+            await worker._reconnect_task
+
+            assert worker.l2_connected
+            assert _listeners() == 2
+            assert await worker.get("key") == "value"
+        finally:
+            await worker.close()
+            await new_host.close()
+            await old_host.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from llm.base import BaseLLMClient, ToolSideEffectError
+from llm.factory import FailoverClient
+
+
+class FailingClient(BaseLLMClient):
+    provider = "primary"
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    async def generate_response(self, *args, **kwargs):
+        raise self.error
+
+
+class RecordingClient(BaseLLMClient):
+    provider = "fallback"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_response(self, *args, **kwargs):
+        self.calls += 1
+        return {"message": "ok"}
+
+
+def test_fails_over_on_provider_errors():
+    fallback = RecordingClient()
+    client = FailoverClient([FailingClient(TimeoutError()), fallback])
+    assert asyncio.run(client.generate_response("hi")) == {"message": "ok"}
+    assert fallback.calls == 1
+
+
+def test_does_not_repeat_state_changing_tools():
+    fallback = RecordingClient()
+    client = FailoverClient([FailingClient(ToolSideEffectError(["store_cart_add"])), fallback])
+    with pytest.raises(ToolSideEffectError):
+        asyncio.run(client.generate_response("add it to my cart"))
+    assert fallback.calls == 0
@@ -0,0 +1,72 @@
+import pytest
+
+import core.payload
+from core.payload import negotiate_encoding, project_data, resolve_fields
+
+
+def test_fields_override_the_profile():
+    assert resolve_fields(" id, name ,price", "minimal") == ("id", "name", "price")
+    assert resolve_fields(None, "minimal") == ("id", "name", "price", "imageUrl")
+    assert resolve_fields(None, "full") is None
+
+
+@pytest.mark.parametrize("fields", ["", ",", " , ,"])
+def test_empty_field_projection_is_rejected(fields):
+    with pytest.raises(ValueError):
+        resolve_fields(fields, "full")
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_fields(None, "tiny")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("identity", None),
+])
+def test_negotiate_encoding(header, expected):
+    if core.payload.brotli is None and expected == "br":
+        expected = "gzip"
+    assert negotiate_encoding(header) == expected
+
+
+def test_brotli_is_not_offered_when_missing(monkeypatch):
+    monkeypatch.setattr(core.payload, "brotli", None)
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+    assert negotiate_encoding("*") == "gzip"
+
+
+def test_product_list_projection_keeps_list_metadata():
+    data = {
+        "searchTerm": "shoe",
+        "pagination": {"page": 1, "total": 2},
+        "debug": {"query": "..."},
+        "results": [
+            {"id": "1", "name": "Shoe", "price": 10, "description": "long"},
+            {"id": "2", "name": "Boot", "description": "long"},
+        ],
+    }
+    assert project_data("product_list", data, ("id", "price")) == {
+        "searchTerm": "shoe",
+        "pagination": {"page": 1, "total": 2},
+        "results": [{"id": "1", "price": 10}, {"id": "2"}],
+    }
+
+
+def test_projection_leaves_other_payloads_untouched():
+    detail = {"id": "1", "name": "Shoe", "description": "long"}
+    cart = {"lineItems": [{"id": "1", "quantity": 2}]}
+    assert project_data("product_detail", detail, ("id", "name")) == {"id": "1", "name": "Shoe"}
+    assert project_data("product_detail", detail, None) is detail
+    assert project_data("cart_list", cart, ("id",)) is cart
+    assert project_data("text", "plain", ("id",)) == "plain"
@@ -0,0 +1,43 @@
+import pytest
+
+from llm.routing import TYPE_COMPARISON, TYPE_DEFAULT, TYPE_PAGINATION, classify_request
+
+
+@pytest.mark.parametrize("message", [
+    "Show next page",
+    "show me page 3",
+    "more results please",
+    "Nächste Seite anzeigen",
+    "zur nächsten Seite bitte",
+    "Seite 2",
+])
+def test_explicit_pagination(message):
+    assert classify_request(message) == TYPE_PAGINATION
+
+
+@pytest.mark.parametrize("message", [
+    "compare the two jackets",
+    "jacket A vs jacket B",
+    "which one is better?",
+    "what's the difference between them?",
+    "Was ist der Unterschied?",
+    "ist die blaue besser als die rote?",
+])
+def test_comparison(message):
+    assert classify_request(message) == TYPE_COMPARISON
+
+
+@pytest.mark.parametrize("message", [
+    "tell me more about this jacket",
+    "Erzähl mir mehr über diese Jacke",
+    "is it better for winter?",
+    "Weiter einkaufen",
+    "Is this the next big trend?",
+    "show me red shoes",
+])
+def test_ordinary_questions_use_the_default_route(message):
+    assert classify_request(message) == TYPE_DEFAULT
+
+
+def test_two_detail_calls_are_a_comparison():
+    assert classify_request("and this one?", ["store_product_detail", "store_product_detail"]) == TYPE_COMPARISON
@@ -0,0 +1,29 @@
+from core.session import SessionState
+from llm.rule_based import RuleBasedClient
+
+
+def _state(term: str, page: int) -> SessionState:
+    state = SessionState()
+    state.update_from_response("product_list", {
+        "searchTerm": term,
+        "results": [{"id": "1", "name": "Rain Jacket"}],
+        "pagination": {"page": page, "limit": 10, "total": 50},
+    })
+    return state
+
+
+def test_pagination_uses_the_structured_session_state():
+    client = RuleBasedClient()
+    state = _state("jacket", 2)
+    assert client._plan("Show next page", state) == ("store_product_search", {"term": "jacket", "page": 3})
+    assert client._plan("Nächste Seite anzeigen", state) == ("store_product_search", {"term": "jacket", "page": 3})
+    assert client._plan("previous page", state) == ("store_product_search", {"term": "jacket", "page": 1})
+    assert client._plan("go to page 5", state) == ("store_product_search", {"term": "jacket", "page": 5})
+
+
+def test_tell_me_more_is_not_a_next_page():
+    client = RuleBasedClient()
+    tool, arguments = client._plan("tell me more about the rain jacket", _state("jacket", 1))
+    assert tool == "store_product_search"
+    assert "page" not in arguments
+
@@ -0,0 +1,39 @@
+import pytest
+
+from core import session as session_module
+from core.session import SessionState
+
+DETAIL = {"id": "p1", "name": "Rain Jacket", "price": 99.0, "stock": 3}
+TTL = 60.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_stitched_prefetched_detail_does_not_extend_its_ttl(clock):
+    state = SessionState()
+    state.set_active_product("p1", "Rain Jacket", detail=DETAIL)
+
+    clock[0] += 40
+    # The model answered from the prefetched detail; no tool ran this turn
+    state.update_from_response("product_detail", DETAIL, tools_used=[])
+    assert state.active_product.detail_is_fresh(TTL)
+
+    clock[0] += 40
+    state.update_from_response("product_detail", DETAIL, tools_used=[])
+    assert not state.active_product.detail_is_fresh(TTL)
+
+
+def test_detail_tool_call_refreshes_the_detail(clock):
+    state = SessionState()
+    state.set_active_product("p1", "Rain Jacket", detail=DETAIL)
+
+    clock[0] += 80
+    updated = {**DETAIL, "stock": 0}
+    state.update_from_response("product_detail", updated, tools_used=["store_product_detail"])
+    assert state.active_product.detail_is_fresh(TTL)
+    assert state.active_product.detail["stock"] == 0
@@ -0,0 +1,43 @@
+from llm.templates import synthesize_response
+
+SEARCH_RESULT = {
+    "searchTerm": "jacket",
+    "pagination": {"page": 2, "limit": 2, "total": 5, "hasNextPage": True},
+    "results": [{"id": "3", "name": "Rain jacket"}, {"id": "4", "name": "Down jacket"}],
+}
+
+
+def test_product_list_is_rendered_in_the_locale():
+    response = synthesize_response(["store_product_search"], {"store_product_search": SEARCH_RESULT}, "de-DE")
+    assert response == {
+        "message": "🛍️ Ich habe 5 Artikel gefunden. Angezeigt werden 3-4.",
+        "type": "product_list",
+        "data": SEARCH_RESULT,
+        "suggestions": ["Nächste Seite anzeigen", "Nach niedrigstem Preis sortieren"],
+    }
+
+
+def test_empty_search_mentions_the_term():
+    data = {"searchTerm": "unicorn", "results": []}
+    response = synthesize_response(["store_product_search"], {"store_product_search": data}, "en-GB")
+    assert response["message"] == "I couldn't find any products for 'unicorn'. 🔍"
+
+
+def test_cart_total_is_rendered():
+    data = {"lineItems": [{"quantity": 2}, {"quantity": 1}], "price": {"totalPrice": 59.5}}
+    response = synthesize_response(["store_cart_get"], {"store_cart_get": data}, "en-GB")
+    assert response["type"] == "cart_list"
+    assert response["message"] == "🛒 You have 3 items in your cart, totalling 59.50."
+
+
+def test_falls_back_to_the_llm():
+    results = {"store_product_search": SEARCH_RESULT}
+    # unknown or unsupported locale: the LLM answers in the user's language
+    assert synthesize_response(["store_product_search"], results, None) is None
+    assert synthesize_response(["store_product_search"], results, "fr-FR") is None
+    # more than one tool, a tool without a template, or a tool error
+    assert synthesize_response(["store_product_search", "store_cart_get"], results, "en-GB") is None
+    assert synthesize_response(["store_product_detail"], {"store_product_detail": {"id": "1"}}, "en-GB") is None
+    assert synthesize_response(["store_cart_get"], {"store_cart_get": {"error": "timeout"}}, "en-GB") is None
+    # data the renderer does not recognise
+    assert synthesize_response(["store_order_list"], {"store_order_list": {"total": 0}}, "en-GB") is None